@@ -7,7 +7,6 @@ Created on Fri Oct  3 17:21:40 2025
 
 import os
 import asyncio
-import nest_asyncio
 
 from dotenv import load_dotenv
 
@@ -17,7 +16,14 @@ from autogen_agentchat.agents import AssistantAgent
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 from autogen_core.models import ModelInfo
 
-nest_asyncio.apply()
+# nest_asyncio solo hace falta si ya hay un event loop corriendo (Spyder/Jupyter)
+try:
+    asyncio.get_running_loop()
+except RuntimeError:
+    pass
+else:
+    import nest_asyncio
+    nest_asyncio.apply()
 
 load_dotenv()
 
@@ -36,4 +42,10 @@ async def main() -> None:
     print(result.messages[-1].content)
     
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop es opcional (no existe en Windows): si está instalado se usa su event loop
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    
+    (uvloop.run if uvloop else asyncio.run)(main())
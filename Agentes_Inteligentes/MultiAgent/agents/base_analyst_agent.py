@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Base común de los agentes analistas: cliente de Gemini, caché de respuestas y guardado de reportes
+"""
+
+import asyncio
+import collections
+import functools
+import hashlib
+import os
+import tempfile
+import time
+import weakref
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+# Modelo de Gemini que usan los agentes analistas
+DEFAULT_MODEL = "gemini-2.5-flash-lite"
+
+# Caché de respuestas de Gemini compartida por todas las instancias de los agentes:
+# clave (ver cache_key) -> (instante de expiración, respuesta). Acotada como LRU:
+# pasado el límite se descartan las entradas usadas hace más tiempo
+LLM_CACHE_TTL = 1800
+LLM_CACHE_MAX_ENTRIES = 256
+_llm_cache: 'collections.OrderedDict[str, Tuple[float, str]]' = collections.OrderedDict()
+
+# Caché persistente en disco (un JSON por prompt) para reutilizar respuestas entre
+# ejecuciones; se consulta cuando la caché en memoria no tiene la respuesta.
+# Al guardar se borran las entradas vencidas y, pasado el límite, las más viejas
+LLM_DISK_CACHE_DIR = os.path.expanduser(os.path.join('~', '.cache', 'agentes_llm'))
+LLM_DISK_CACHE_TTL = 86400
+LLM_DISK_CACHE_MAX_ENTRIES = 500
+
+# Límites del pool de conexiones HTTP hacia Gemini: holgados para que los
+# prompts lanzados con asyncio.gather no queden esperando una conexión libre
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+
+# Resumen que se devuelve sin consultar a Gemini cuando no hay nada que resumir
+NO_DATA_SUMMARY = "Sin datos para resumir."
+
+# Opciones de orjson para los reportes: los valores de NumPy/pandas se serializan directamente
+REPORT_JSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+@functools.cache
+def _autogen():
+    """Importa autogen una sola vez y recién cuando se necesita (es un import pesado)"""
+    from autogen_agentchat.agents import AssistantAgent
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+    from autogen_core.models import ModelInfo
+    return AssistantAgent, OpenAIChatCompletionClient, ModelInfo
+
+
+# Clientes de Gemini compartidos, por event loop: loop -> {(api_key, modelo): cliente}. El cliente
+# HTTP queda atado al loop en el que se usa, así que cada asyncio.run() nuevo crea el suyo;
+# close_model_clients los cierra antes de que termine el loop
+_model_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_model_client(api_key: str, model: str = DEFAULT_MODEL):
+    """Devuelve el cliente de Gemini compartido para (api_key, modelo) en el event loop en curso"""
+    clients = _model_clients.setdefault(asyncio.get_running_loop(), {})
+    client = clients.get((api_key, model))
+    if client is None:
+        client = clients[(api_key, model)] = _create_model_client(api_key, model)
+    return client
+
+
+async def close_model_clients() -> None:
+    """Cierra los clientes de Gemini del event loop en curso junto con sus pools de conexiones"""
+    clients = _model_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        try:
+            await client.close()
+        except Exception as e:
+            print(f"Error cerrando el cliente de Gemini: {e}")
+
+
+def _create_model_client(api_key: str, model: str):
+    """Crea un cliente de Gemini con su propio pool de conexiones HTTP"""
+    import httpx
+    from openai import DefaultAsyncHttpxClient
+    
+    _, OpenAIChatCompletionClient, ModelInfo = _autogen()
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS
+    )
+    return OpenAIChatCompletionClient(
+        api_key=api_key,
+        model=model,
+        http_client=DefaultAsyncHttpxClient(limits=limits),
+        model_info=ModelInfo(
+            vision=True,
+            function_calling=True,
+            json_output=True,
+            family="unknown",
+            structured_output=True
+        )
+    )
+
+
+def build_prompt(instructions: str, data_block: str) -> str:
+    """Arma un prompt con las instrucciones fijas primero y los datos variables al final"""
+    return f"{instructions}\n\nDATOS:\n{data_block}"
+
+
+def to_json(obj) -> str:
+    """Serializa datos a JSON indentado (UTF-8, sin escapar acentos) para los prompts"""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+def strip_code_fence(text: str) -> str:
+    """Quita el bloque ```json ... ``` con el que Gemini suele envolver las respuestas JSON"""
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        text = text.rsplit('```', 1)[0]
+    return text
+
+
+def load_json_sync(filepath: str):
+    """Lee y parsea un archivo JSON (bloqueante, pensado para asyncio.to_thread)"""
+    with open(filepath, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+def write_report_sync(filepath: str, report: Dict) -> None:
+    """Serializa y escribe un reporte en disco (bloqueante, pensado para asyncio.to_thread)"""
+    with open(filepath, 'wb') as f:
+        f.write(orjson.dumps(report, option=REPORT_JSON_OPTIONS))
+
+
+def cache_key(prompt: str, system_prompt: str, model: str) -> str:
+    """Clave de la caché de respuestas: el mismo prompt con otro mensaje de sistema o modelo es otra consulta"""
+    return hashlib.sha256('\0'.join((model, system_prompt, prompt)).encode('utf-8')).hexdigest()
+
+
+def _disk_cache_path(key: str) -> str:
+    """Ruta del archivo de la caché en disco para una clave"""
+    return os.path.join(LLM_DISK_CACHE_DIR, f"{key}.json")
+
+
+def _disk_cache_get(key: str) -> Optional[str]:
+    """Devuelve la respuesta guardada en disco si existe y no expiró"""
+    try:
+        with open(_disk_cache_path(key), 'rb') as f:
+            entry = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    
+    if entry.get('expires_at', 0) < time.time():
+        _remove_quietly(_disk_cache_path(key))
+        return None
+    return entry.get('content')
+
+
+def _disk_cache_set(key: str, content: str) -> None:
+    """Guarda una respuesta en disco; se escribe a un temporal y se reemplaza de forma atómica"""
+    try:
+        os.makedirs(LLM_DISK_CACHE_DIR, exist_ok=True)
+        entry = {'expires_at': time.time() + LLM_DISK_CACHE_TTL, 'content': content}
+        with tempfile.NamedTemporaryFile('wb', dir=LLM_DISK_CACHE_DIR, suffix='.tmp', delete=False) as f:
+            f.write(orjson.dumps(entry))
+        os.replace(f.name, _disk_cache_path(key))
+    except OSError as e:
+        print(f"No se pudo guardar la respuesta en la caché en disco: {e}")
+        return
+    
+    _prune_disk_cache()
+
+
+def _prune_disk_cache() -> None:
+    """Borra las entradas vencidas y, si se pasa del límite, las más viejas.
+    
+    La antigüedad se toma del mtime del archivo (cada entrada vence LLM_DISK_CACHE_TTL
+    segundos después de escribirse), así no hace falta leer cada JSON.
+    """
+    try:
+        with os.scandir(LLM_DISK_CACHE_DIR) as it:
+            entries = [(e.stat().st_mtime, e.path) for e in it if e.is_file()]
+    except OSError:
+        return
+    
+    entries.sort(reverse=True)
+    expired_before = time.time() - LLM_DISK_CACHE_TTL
+    for i, (mtime, path) in enumerate(entries):
+        if i >= LLM_DISK_CACHE_MAX_ENTRIES or mtime < expired_before:
+            _remove_quietly(path)
+
+
+def _remove_quietly(path: str) -> None:
+    """Borra un archivo ignorando que ya no exista o no se pueda borrar"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class BaseAnalystAgent:
+    """Funcionalidad compartida por los agentes analistas"""
+    
+    # Cada subclase define el prefijo del archivo de reporte y cómo se lo nombra en los mensajes
+    report_prefix = "report"
+    report_label = "Reporte"
+    model = DEFAULT_MODEL
+    
+    def __init__(self, api_key: str, agent_name: str, system_prompt: str):
+        """Inicializa el agente; el cliente de Gemini se obtiene al usarlo (ver model_client)"""
+        self.api_key = api_key
+        self.agent_name = agent_name
+        self.system_prompt = system_prompt
+    
+    @property
+    def model_client(self):
+        """Cliente de Gemini compartido del event loop en curso"""
+        return get_model_client(self.api_key, self.model)
+    
+    async def _cached_run(self, prompt: str) -> str:
+        """Ejecuta un prompt reutilizando la respuesta si ya se envió uno idéntico"""
+        key = cache_key(prompt, self.system_prompt, self.model)
+        cached = _llm_cache.get(key)
+        if cached:
+            if cached[0] > time.monotonic():
+                _llm_cache.move_to_end(key)
+                return cached[1]
+            del _llm_cache[key]
+        
+        content = await asyncio.to_thread(_disk_cache_get, key)
+        if content is None:
+            content = await self._run_prompt(prompt)
+            await asyncio.to_thread(_disk_cache_set, key, content)
+        
+        _llm_cache[key] = (time.monotonic() + LLM_CACHE_TTL, content)
+        _llm_cache.move_to_end(key)
+        if len(_llm_cache) > LLM_CACHE_MAX_ENTRIES:
+            _llm_cache.popitem(last=False)
+        return content
+    
+    def _evict_cached(self, prompt: str) -> None:
+        """Descarta la respuesta de un prompt de ambas cachés"""
+        key = cache_key(prompt, self.system_prompt, self.model)
+        _llm_cache.pop(key, None)
+        _remove_quietly(_disk_cache_path(key))
+    
+    async def _run_prompt(self, prompt: str) -> str:
+        """Ejecuta un prompt en Gemini y devuelve el texto de la respuesta"""
+        AssistantAgent = _autogen()[0]
+        
+        # AssistantAgent acumula el historial entre llamadas: se usa una instancia
+        # por prompt para que los análisis en paralelo no mezclen sus contextos
+        assistant = AssistantAgent(
+            name=self.agent_name,
+            model_client=self.model_client,
+            system_message=self.system_prompt
+        )
+        result = await assistant.run(task=prompt)
+        return result.messages[-1].content
+    
+    async def save_report(self, report: Dict, filename: str = None, timestamp: Optional[datetime] = None) -> str:
+        """Guarda el reporte de análisis en un archivo (timestamp: instante usado en el nombre)"""
+        if not filename:
+            timestamp = (timestamp or datetime.now()).strftime("%Y%m%d_%H%M%S")
+            filename = f"{self.report_prefix}_{timestamp}.json"
+        
+        # Asegurar que el directorio existe
+        reports_dir = "reports"
+        os.makedirs(reports_dir, exist_ok=True)
+        
+        filepath = os.path.join(reports_dir, filename)
+        
+        try:
+            # Escribir en un hilo para no bloquear el event loop
+            await asyncio.to_thread(write_report_sync, filepath, report)
+            
+            print(f"{self.report_label} guardado en: {filepath}")
+            return filepath
+        
+        except Exception as e:
+            print(f"Error guardando reporte: {e}")
+            return ""
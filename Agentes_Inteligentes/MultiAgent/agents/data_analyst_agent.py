@@ -4,69 +4,136 @@ Data Analyst Agent para analizar datos financieros y generar reportes
 """
 
 import asyncio
-import json
 import os
 from datetime import datetime
-from typing import Dict, List, Optional
-import pandas as pd
+from typing import Dict, List, Optional, Tuple
 
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from autogen_core.models import ModelInfo
+import orjson
 
+from base_analyst_agent import (
+    NO_DATA_SUMMARY,
+    BaseAnalystAgent,
+    build_prompt,
+    close_model_clients,
+    load_json_sync,
+    strip_code_fence,
+    to_json
+)
 
-class DataAnalystAgent:
+# Tabla para limpiar porcentajes como "+1.25%" en una sola pasada
+_PCT_CLEAN = str.maketrans('', '', '%+')
+
+# Claves del JSON que devuelve el prompt agrupado, en el orden del reporte
+BATCH_SECTIONS = ('merval_analysis', 'stocks_analysis', 'currency_analysis', 'market_trends', 'summary')
+
+# Resultado de las tendencias cuando no llegó ninguna sección de datos
+NO_MARKET_DATA = {'status': 'no_data', 'message': 'No hay datos de mercado disponibles'}
+
+# Mensaje de sistema fijo para todas las consultas del agente
+SYSTEM_PROMPT = (
+    "Eres un analista financiero especializado en el mercado argentino. "
+    "Respondes en español, con lenguaje claro y basándote solo en los datos provistos."
+)
+
+# Instrucciones fijas de cada prompt. Los datos variables van siempre al final
+# (ver build_prompt) para que el prefijo se repita entre llamadas
+MERVAL_PROMPT = """Analiza el comportamiento del índice MERVAL argentino con los datos indicados al final.
+
+Proporciona:
+1. Interpretación del movimiento del índice
+2. Posibles factores que influyen en esta tendencia
+3. Contexto histórico relevante
+4. Recomendaciones para inversores"""
+
+STOCKS_PROMPT = """Analiza el comportamiento de las principales acciones argentinas con los datos indicados al final.
+
+Proporciona:
+1. Análisis sectorial del mercado argentino
+2. Identificación de las acciones más destacadas
+3. Patrones observados en el comportamiento
+4. Recomendaciones de inversión"""
+
+CURRENCY_PROMPT = """Analiza el comportamiento del tipo de cambio USD/ARS con los datos indicados al final.
+
+Proporciona:
+1. Interpretación del nivel del tipo de cambio
+2. Impacto en la economía argentina
+3. Factores que influyen en la cotización
+4. Perspectivas para inversores y empresas"""
+
+TRENDS_PROMPT = """Analiza las tendencias generales del mercado financiero argentino con los datos consolidados indicados al final.
+
+Proporciona:
+1. Resumen de las tendencias del día
+2. Correlaciones entre diferentes instrumentos
+3. Factores macroeconómicos relevantes
+4. Perspectivas a corto plazo
+5. Recomendaciones estratégicas"""
+
+SUMMARY_PROMPT = """Genera un resumen ejecutivo del análisis financiero argentino con los indicadores clave indicados al final.
+
+El resumen debe incluir:
+1. Puntos clave del día
+2. Conclusiones principales
+3. Recomendaciones para diferentes tipos de inversores
+4. Perspectivas para el próximo período
+
+Formato: Máximo 3 párrafos, lenguaje claro y directo."""
+
+BATCH_PROMPT = """Analiza el mercado financiero argentino con los datos indicados al final.
+
+Responde ÚNICAMENTE con un objeto JSON con estas cinco claves, cada una con texto:
+- "merval_analysis": interpretación del movimiento del MERVAL, factores que influyen,
+  contexto histórico y recomendaciones para inversores
+- "stocks_analysis": análisis sectorial, acciones más destacadas, patrones observados
+  y recomendaciones de inversión
+- "currency_analysis": nivel del tipo de cambio USD/ARS, impacto en la economía,
+  factores que influyen y perspectivas para inversores y empresas
+- "market_trends": tendencias del día, correlaciones entre instrumentos, factores
+  macroeconómicos, perspectivas a corto plazo y recomendaciones estratégicas
+- "summary": resumen ejecutivo de máximo 3 párrafos, claro y directo, con puntos clave,
+  conclusiones, recomendaciones por tipo de inversor y perspectivas"""
+
+
+def _has_market_data(data: Dict) -> bool:
+    """Indica si hay al menos una sección de datos de mercado para analizar"""
+    return bool(data.get('merval') or data.get('stocks') or data.get('currency'))
+
+
+class DataAnalystAgent(BaseAnalystAgent):
     """Agente especializado en análisis de datos financieros"""
     
+    report_prefix = "financial_report"
+    report_label = "Reporte"
+    
     def __init__(self, api_key: str):
         """Inicializa el agente analista de datos"""
-        self.api_key = api_key
-        
-        # Configurar el modelo Gemini
-        model_client = OpenAIChatCompletionClient(
-            api_key=api_key,
-            model="gemini-2.5-flash-lite",
-            model_info=ModelInfo(
-                vision=True, 
-                function_calling=True, 
-                json_output=True, 
-                family="unknown", 
-                structured_output=True
-            )
-        )
-        
-        self.assistant_agent = AssistantAgent(
-            name="data_analyst",
-            model_client=model_client
-        )
+        super().__init__(api_key, "data_analyst", SYSTEM_PROMPT)
     
     async def analyze_financial_data(self, data_file_path: str) -> Dict:
         """Analiza los datos financieros y genera insights"""
+        # Un único instante de referencia para todo el reporte
+        run_ts = datetime.now().isoformat()
+        
         try:
             # Cargar datos del archivo
-            with open(data_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Análisis del MERVAL
-            merval_analysis = await self._analyze_merval(data.get('merval', {}))
-            
-            # Análisis de acciones individuales
-            stocks_analysis = await self._analyze_stocks(data.get('stocks', []))
+            data = await asyncio.to_thread(load_json_sync, data_file_path)
             
-            # Análisis de divisas
-            currency_analysis = await self._analyze_currency(data.get('currency', {}))
-            
-            # Análisis de tendencias generales
-            market_trends = await self._analyze_market_trends(data)
+            # Intentar resolver todo en una sola llamada; si la respuesta no es un
+            # JSON válido se vuelve a los análisis individuales en paralelo
+            sections = await self._analyze_batched(data, run_ts)
+            if sections is None:
+                sections = await self._analyze_separately(data, run_ts)
+            merval_analysis, stocks_analysis, currency_analysis, market_trends, summary = sections
             
             # Generar reporte consolidado
             report = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': run_ts,
                 'merval_analysis': merval_analysis,
                 'stocks_analysis': stocks_analysis,
                 'currency_analysis': currency_analysis,
                 'market_trends': market_trends,
-                'summary': await self._generate_executive_summary(data)
+                'summary': summary
             }
             
             return report
@@ -75,46 +142,160 @@ class DataAnalystAgent:
             print(f"Error analizando datos: {e}")
             return {}
     
-    async def _analyze_merval(self, merval_data: Dict) -> Dict:
-        """Analiza específicamente el índice MERVAL"""
+    async def _analyze_batched(self, data: Dict, run_ts: str) -> Optional[Tuple]:
+        """Genera los cinco análisis con un único prompt que devuelve JSON"""
+        try:
+            merval_analysis = self._merval_stats(data.get('merval', {}))
+            stocks_analysis = self._stocks_stats(data.get('stocks', []))
+            currency_analysis = self._currency_stats(data.get('currency', {}))
+            market_trends = {'trend_data': {**self._trend_data(data), 'timestamp': run_ts}}
+            
+            # Sin datos de mercado no hay nada que pedirle a Gemini
+            if not _has_market_data(data):
+                return merval_analysis, stocks_analysis, currency_analysis, dict(NO_MARKET_DATA), NO_DATA_SUMMARY
+            
+            batch_prompt = build_prompt(
+                BATCH_PROMPT,
+                f"{to_json(data)}\n\n"
+                f"Estadísticas de acciones:\n"
+                f"- Total de acciones analizadas: {stocks_analysis.get('total_stocks', 0)}\n"
+                f"- Acciones con ganancias: {stocks_analysis.get('positive_changes', 0)}\n"
+                f"- Acciones con pérdidas: {stocks_analysis.get('negative_changes', 0)}"
+            )
+            
+            content = await self._cached_run(batch_prompt)
+            try:
+                parsed = orjson.loads(strip_code_fence(content))
+                texts = [parsed[key] for key in BATCH_SECTIONS]
+                if not all(isinstance(text, str) for text in texts):
+                    raise ValueError("las secciones deben ser texto")
+            except (orjson.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                # No guardar en caché una respuesta que no se pudo interpretar
+                self._evict_cached(batch_prompt)
+                print(f"Respuesta agrupada inválida ({e}), se usan análisis individuales")
+                return None
+            
+            sections = [merval_analysis, stocks_analysis, currency_analysis, market_trends]
+            for section, text in zip(sections, texts):
+                if section.get('status') != 'no_data':
+                    section['analysis'] = text
+            
+            return (*sections, texts[4])
+        
+        except Exception as e:
+            print(f"Error en el análisis agrupado: {e}")
+            return None
+    
+    async def _analyze_separately(self, data: Dict, run_ts: str) -> Tuple:
+        """Ejecuta cada análisis con su propio prompt, en paralelo"""
+        results = await asyncio.gather(
+            self._analyze_merval(data.get('merval', {})),
+            self._analyze_stocks(data.get('stocks', [])),
+            self._analyze_currency(data.get('currency', {})),
+            self._analyze_market_trends(data, run_ts),
+            return_exceptions=True
+        )
+        
+        # Reemplazar las ramas que fallaron por un resultado de error
+        sections = [
+            {'status': 'error', 'message': str(r)} if isinstance(r, Exception) else r
+            for r in results
+        ]
+        
+        # El resumen se arma con los resultados de los análisis, no con los datos crudos
+        summary = await self._generate_executive_summary(*sections)
+        
+        return (*sections, summary)
+    
+    def _merval_stats(self, merval_data: Dict) -> Dict:
+        """Calcula los datos del MERVAL que no dependen de Gemini"""
         if not merval_data:
             return {'status': 'no_data', 'message': 'No hay datos del MERVAL disponibles'}
         
+        # Extraer información numérica del cambio
+        change_str = merval_data.get('change', '0%')
+        change_value = float(change_str.translate(_PCT_CLEAN))
+        
+        # Determinar tendencia
+        trend = 'positiva' if change_value > 0 else 'negativa' if change_value < 0 else 'neutral'
+        
+        return {
+            'price': merval_data.get('price'),
+            'change': merval_data.get('change'),
+            'change_value': change_value,
+            'trend': trend,
+            'timestamp': merval_data.get('timestamp')
+        }
+    
+    def _stocks_stats(self, stocks_data: List[Dict]) -> Dict:
+        """Calcula las estadísticas de las acciones que no dependen de Gemini"""
+        if not stocks_data:
+            return {'status': 'no_data', 'message': 'No hay datos de acciones disponibles'}
+        
+        # pandas se importa aquí para no pagar su carga cuando no hay acciones que analizar
+        import pandas as pd
+        
+        # Calcular estadísticas básicas sobre todas las acciones a la vez
+        total_stocks = len(stocks_data)
+        df = pd.DataFrame(stocks_data, columns=['symbol', 'price', 'change'])
+        
+        change_str = df['change'].fillna('0').astype(str)
+        df['change_value'] = pd.to_numeric(
+            change_str.str.translate(_PCT_CLEAN),
+            errors='coerce'
+        )
+        
+        # Descartar las acciones cuyo cambio no es numérico
+        df = df.dropna(subset=['change_value'])
+        
+        positive_changes = int((df['change_value'] > 0).sum())
+        negative_changes = int((df['change_value'] < 0).sum())
+        
+        return {
+            'total_stocks': total_stocks,
+            'positive_changes': positive_changes,
+            'negative_changes': negative_changes,
+            'market_sentiment': 'positive' if positive_changes > negative_changes else 'negative',
+            'stocks': df.to_dict('records')
+        }
+    
+    def _currency_stats(self, currency_data: Dict) -> Dict:
+        """Extrae los datos de divisas que se incluyen en el reporte"""
+        if not currency_data:
+            return {'status': 'no_data', 'message': 'No hay datos de divisas disponibles'}
+        
+        return {
+            'pair': currency_data.get('pair'),
+            'price': currency_data.get('price'),
+            'timestamp': currency_data.get('timestamp')
+        }
+    
+    def _trend_data(self, data: Dict) -> Dict:
+        """Recopila la información consolidada para el análisis de tendencias (sin el timestamp
+        de la ejecución, para que el prompt armado con ella pueda salir de la caché)"""
+        return {
+            'merval_trend': data.get('merval', {}).get('change', 'N/A'),
+            'stocks_count': len(data.get('stocks', [])),
+            'currency_level': data.get('currency', {}).get('price', 'N/A')
+        }
+    
+    async def _analyze_merval(self, merval_data: Dict) -> Dict:
+        """Analiza específicamente el índice MERVAL"""
         try:
-            # Extraer información numérica del cambio
-            change_str = merval_data.get('change', '0%')
-            change_value = float(change_str.replace('%', '').replace('+', ''))
-            
-            # Determinar tendencia
-            trend = 'positiva' if change_value > 0 else 'negativa' if change_value < 0 else 'neutral'
+            merval_analysis = self._merval_stats(merval_data)
+            if merval_analysis.get('status') == 'no_data':
+                return merval_analysis
             
             # Generar análisis con Gemini
-            analysis_prompt = f"""
-            Analiza el comportamiento del índice MERVAL argentino:
-            
-            Datos:
-            - Precio: {merval_data.get('price', 'N/A')}
-            - Cambio: {merval_data.get('change', 'N/A')}
-            - Timestamp: {merval_data.get('timestamp', 'N/A')}
-            
-            Proporciona:
-            1. Interpretación del movimiento del índice
-            2. Posibles factores que influyen en esta tendencia
-            3. Contexto histórico relevante
-            4. Recomendaciones para inversores
-            """
-            
-            result = await self.assistant_agent.run(task=analysis_prompt)
-            gemini_analysis = result.messages[-1].content
+            analysis_prompt = build_prompt(
+                MERVAL_PROMPT,
+                f"- Precio: {merval_data.get('price', 'N/A')}\n"
+                f"- Cambio: {merval_data.get('change', 'N/A')}\n"
+                f"- Timestamp: {merval_data.get('timestamp', 'N/A')}"
+            )
             
-            return {
-                'price': merval_data.get('price'),
-                'change': merval_data.get('change'),
-                'change_value': change_value,
-                'trend': trend,
-                'analysis': gemini_analysis,
-                'timestamp': merval_data.get('timestamp')
-            }
+            merval_analysis['analysis'] = await self._cached_run(analysis_prompt)
+            return merval_analysis
             
         except Exception as e:
             print(f"Error analizando MERVAL: {e}")
@@ -122,67 +303,23 @@ class DataAnalystAgent:
     
     async def _analyze_stocks(self, stocks_data: List[Dict]) -> Dict:
         """Analiza las acciones individuales"""
-        if not stocks_data:
-            return {'status': 'no_data', 'message': 'No hay datos de acciones disponibles'}
-        
         try:
-            # Calcular estadísticas básicas
-            total_stocks = len(stocks_data)
-            positive_changes = 0
-            negative_changes = 0
-            
-            stock_summaries = []
-            
-            for stock in stocks_data:
-                try:
-                    change_str = stock.get('change', '0')
-                    change_value = float(change_str.replace('%', '').replace('+', ''))
-                    
-                    if change_value > 0:
-                        positive_changes += 1
-                    elif change_value < 0:
-                        negative_changes += 1
-                    
-                    stock_summaries.append({
-                        'symbol': stock.get('symbol'),
-                        'price': stock.get('price'),
-                        'change': stock.get('change'),
-                        'change_value': change_value
-                    })
-                    
-                except ValueError:
-                    continue
+            stocks_analysis = self._stocks_stats(stocks_data)
+            if stocks_analysis.get('status') == 'no_data':
+                return stocks_analysis
             
             # Generar análisis con Gemini
-            analysis_prompt = f"""
-            Analiza el comportamiento de las principales acciones argentinas:
-            
-            Datos de acciones:
-            {json.dumps(stock_summaries, indent=2, ensure_ascii=False)}
-            
-            Estadísticas:
-            - Total de acciones analizadas: {total_stocks}
-            - Acciones con ganancias: {positive_changes}
-            - Acciones con pérdidas: {negative_changes}
-            
-            Proporciona:
-            1. Análisis sectorial del mercado argentino
-            2. Identificación de las acciones más destacadas
-            3. Patrones observados en el comportamiento
-            4. Recomendaciones de inversión
-            """
-            
-            result = await self.assistant_agent.run(task=analysis_prompt)
-            gemini_analysis = result.messages[-1].content
+            analysis_prompt = build_prompt(
+                STOCKS_PROMPT,
+                f"Datos de acciones:\n{to_json(stocks_analysis['stocks'])}\n\n"
+                f"Estadísticas:\n"
+                f"- Total de acciones analizadas: {stocks_analysis['total_stocks']}\n"
+                f"- Acciones con ganancias: {stocks_analysis['positive_changes']}\n"
+                f"- Acciones con pérdidas: {stocks_analysis['negative_changes']}"
+            )
             
-            return {
-                'total_stocks': total_stocks,
-                'positive_changes': positive_changes,
-                'negative_changes': negative_changes,
-                'market_sentiment': 'positive' if positive_changes > negative_changes else 'negative',
-                'stocks': stock_summaries,
-                'analysis': gemini_analysis
-            }
+            stocks_analysis['analysis'] = await self._cached_run(analysis_prompt)
+            return stocks_analysis
             
         except Exception as e:
             print(f"Error analizando acciones: {e}")
@@ -190,71 +327,42 @@ class DataAnalystAgent:
     
     async def _analyze_currency(self, currency_data: Dict) -> Dict:
         """Analiza el comportamiento de las divisas"""
-        if not currency_data:
-            return {'status': 'no_data', 'message': 'No hay datos de divisas disponibles'}
-        
         try:
-            # Generar análisis con Gemini
-            analysis_prompt = f"""
-            Analiza el comportamiento del tipo de cambio USD/ARS:
+            currency_analysis = self._currency_stats(currency_data)
+            if currency_analysis.get('status') == 'no_data':
+                return currency_analysis
             
-            Datos:
-            - Par: {currency_data.get('pair', 'N/A')}
-            - Precio: {currency_data.get('price', 'N/A')}
-            - Timestamp: {currency_data.get('timestamp', 'N/A')}
-            
-            Proporciona:
-            1. Interpretación del nivel del tipo de cambio
-            2. Impacto en la economía argentina
-            3. Factores que influyen en la cotización
-            4. Perspectivas para inversores y empresas
-            """
+            # Generar análisis con Gemini
+            analysis_prompt = build_prompt(
+                CURRENCY_PROMPT,
+                f"- Par: {currency_data.get('pair', 'N/A')}\n"
+                f"- Precio: {currency_data.get('price', 'N/A')}\n"
+                f"- Timestamp: {currency_data.get('timestamp', 'N/A')}"
+            )
             
-            result = await self.assistant_agent.run(task=analysis_prompt)
-            gemini_analysis = result.messages[-1].content
-            
-            return {
-                'pair': currency_data.get('pair'),
-                'price': currency_data.get('price'),
-                'analysis': gemini_analysis,
-                'timestamp': currency_data.get('timestamp')
-            }
+            currency_analysis['analysis'] = await self._cached_run(analysis_prompt)
+            return currency_analysis
             
         except Exception as e:
             print(f"Error analizando divisas: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    async def _analyze_market_trends(self, data: Dict) -> Dict:
+    async def _analyze_market_trends(self, data: Dict, run_ts: str) -> Dict:
         """Analiza tendencias generales del mercado"""
+        if not _has_market_data(data):
+            return dict(NO_MARKET_DATA)
+        
         try:
             # Recopilar información para análisis de tendencias
-            trend_data = {
-                'merval_trend': data.get('merval', {}).get('change', 'N/A'),
-                'stocks_count': len(data.get('stocks', [])),
-                'currency_level': data.get('currency', {}).get('price', 'N/A'),
-                'timestamp': datetime.now().isoformat()
-            }
+            trend_data = self._trend_data(data)
             
             # Generar análisis de tendencias con Gemini
-            analysis_prompt = f"""
-            Analiza las tendencias generales del mercado financiero argentino:
-            
-            Datos consolidados:
-            {json.dumps(trend_data, indent=2, ensure_ascii=False)}
+            analysis_prompt = build_prompt(TRENDS_PROMPT, to_json(trend_data))
             
-            Proporciona:
-            1. Resumen de las tendencias del día
-            2. Correlaciones entre diferentes instrumentos
-            3. Factores macroeconómicos relevantes
-            4. Perspectivas a corto plazo
-            5. Recomendaciones estratégicas
-            """
-            
-            result = await self.assistant_agent.run(task=analysis_prompt)
-            gemini_analysis = result.messages[-1].content
+            gemini_analysis = await self._cached_run(analysis_prompt)
             
             return {
-                'trend_data': trend_data,
+                'trend_data': {**trend_data, 'timestamp': run_ts},
                 'analysis': gemini_analysis
             }
             
@@ -262,55 +370,40 @@ class DataAnalystAgent:
             print(f"Error analizando tendencias: {e}")
             return {'status': 'error', 'message': str(e)}
     
-    async def _generate_executive_summary(self, data: Dict) -> str:
-        """Genera un resumen ejecutivo del análisis"""
+    async def _generate_executive_summary(self, merval_analysis: Dict, stocks_analysis: Dict,
+                                          currency_analysis: Dict, market_trends: Dict) -> str:
+        """Genera un resumen ejecutivo a partir de los indicadores clave de cada análisis"""
+        # Si ningún análisis tuvo datos (o todos fallaron) no hay nada que resumir
+        sections = (merval_analysis, stocks_analysis, currency_analysis, market_trends)
+        if all('status' in section for section in sections):
+            return NO_DATA_SUMMARY
+        
         try:
-            summary_prompt = f"""
-            Genera un resumen ejecutivo del análisis financiero argentino:
-            
-            Datos disponibles:
-            {json.dumps(data, indent=2, ensure_ascii=False)}
-            
-            El resumen debe incluir:
-            1. Puntos clave del día
-            2. Conclusiones principales
-            3. Recomendaciones para diferentes tipos de inversores
-            4. Perspectivas para el próximo período
-            
-            Formato: Máximo 3 párrafos, lenguaje claro y directo.
-            """
+            key_points = {
+                'merval': {
+                    'change': merval_analysis.get('change'),
+                    'trend': merval_analysis.get('trend')
+                },
+                'stocks': {
+                    'total': stocks_analysis.get('total_stocks'),
+                    'positive_changes': stocks_analysis.get('positive_changes'),
+                    'negative_changes': stocks_analysis.get('negative_changes'),
+                    'market_sentiment': stocks_analysis.get('market_sentiment')
+                },
+                'currency': {
+                    'pair': currency_analysis.get('pair'),
+                    'price': currency_analysis.get('price')
+                },
+                'stocks_count': market_trends.get('trend_data', {}).get('stocks_count')
+            }
+            summary_prompt = build_prompt(SUMMARY_PROMPT, to_json(key_points))
             
-            result = await self.assistant_agent.run(task=summary_prompt)
-            return result.messages[-1].content
+            return await self._cached_run(summary_prompt)
             
         except Exception as e:
             print(f"Error generando resumen ejecutivo: {e}")
             return "No se pudo generar el resumen ejecutivo."
     
-    async def save_report(self, report: Dict, filename: str = None) -> str:
-        """Guarda el reporte de análisis en un archivo"""
-        if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"financial_report_{timestamp}.json"
-        
-        # Asegurar que el directorio existe
-        reports_dir = "reports"
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir, exist_ok=True)
-        
-        filepath = os.path.join(reports_dir, filename)
-        
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2, ensure_ascii=False)
-            
-            print(f"Reporte guardado en: {filepath}")
-            return filepath
-            
-        except Exception as e:
-            print(f"Error guardando reporte: {e}")
-            return ""
-    
     async def run(self, data_file_path: str) -> str:
         """Ejecuta el agente analista de datos"""
         print("Iniciando Data Analyst Agent...")
@@ -320,7 +413,8 @@ class DataAnalystAgent:
         
         if report:
             # Guardar reporte
-            filepath = await self.save_report(report)
+            # Reutilizar el instante del reporte para el nombre del archivo
+            filepath = await self.save_report(report, timestamp=datetime.fromisoformat(report['timestamp']))
             
             print("Analisis completado exitosamente:")
             print(f"Reporte guardado en: {filepath}")
@@ -346,18 +440,26 @@ async def main():
         print("No se encontro el directorio de datos")
         return
     
-    data_files = [f for f in os.listdir(data_dir) if f.startswith('stock_data_') and f.endswith('.json')]
-    if not data_files:
+    # Usar el archivo más reciente (el nombre lleva el timestamp, basta con el máximo)
+    latest_file = None
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith('stock_data_') and name.endswith('.json') and (latest_file is None or name > latest_file):
+                latest_file = name
+    
+    if latest_file is None:
         print("No se encontraron archivos de datos")
         return
     
-    # Usar el archivo más reciente
-    latest_file = sorted(data_files)[-1]
     data_file_path = os.path.join(data_dir, latest_file)
     
     # Crear y ejecutar el agente
     analyst = DataAnalystAgent(api_key)
-    result = await analyst.run(data_file_path)
+    try:
+        result = await analyst.run(data_file_path)
+    finally:
+        await close_model_clients()
     
     if result:
         print(f"Data Analyst Agent completado. Reporte guardado en: {result}")
@@ -366,4 +468,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop es opcional (no existe en Windows): si está instalado se usa su event loop
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    
+    (uvloop.run if uvloop else asyncio.run)(main())
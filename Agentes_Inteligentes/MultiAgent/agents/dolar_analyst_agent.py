@@ -4,48 +4,121 @@ Dolar Analyst Agent para analizar específicamente datos de DolarAPI
 """
 
 import asyncio
-import json
 import os
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Tuple
 
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from autogen_core.models import ModelInfo
+import numpy as np
 
+from base_analyst_agent import (
+    NO_DATA_SUMMARY,
+    BaseAnalystAgent,
+    build_prompt,
+    close_model_clients,
+    load_json_sync,
+    to_json
+)
 
-class DolarAnalystAgent:
+# Mensaje de sistema fijo para todas las consultas del agente
+SYSTEM_PROMPT = (
+    "Eres un analista especializado en el mercado cambiario argentino. "
+    "Respondes en español, con lenguaje claro y basándote solo en los datos de DolarAPI provistos."
+)
+
+# Instrucciones fijas de cada prompt. Los datos variables van siempre al final
+# (ver build_prompt) para que el prefijo se repita entre llamadas
+COTIZATIONS_PROMPT = """Analiza las cotizaciones del dólar en Argentina obtenidas de DolarAPI que se indican al final.
+
+Proporciona un análisis detallado que incluya:
+1. Interpretación de cada tipo de cotización (oficial, blue, bolsa, etc.)
+2. Diferencias entre las cotizaciones y su significado
+3. Factores que influyen en cada tipo de cotización
+4. Implicaciones para diferentes tipos de usuarios (inversores, empresas, consumidores)
+5. Recomendaciones específicas para cada tipo de cotización"""
+
+GAPS_PROMPT = """Analiza las brechas cambiarias en Argentina basándote en los datos indicados al final.
+
+Proporciona:
+1. Interpretación de las brechas cambiarias
+2. Factores que generan estas diferencias
+3. Impacto económico de las brechas
+4. Perspectivas sobre la convergencia o divergencia
+5. Recomendaciones para diferentes actores económicos"""
+
+TRENDS_PROMPT = """Analiza las tendencias del mercado cambiario argentino basándote en los datos indicados al final.
+
+Proporciona:
+1. Análisis de los spreads entre compra y venta
+2. Identificación de patrones en las cotizaciones
+3. Factores que influyen en las tendencias
+4. Perspectivas a corto y mediano plazo
+5. Recomendaciones estratégicas"""
+
+SUMMARY_PROMPT = """Genera un resumen ejecutivo del análisis de cotizaciones del dólar en Argentina con los indicadores clave indicados al final.
+
+El resumen debe incluir:
+1. Puntos clave del mercado cambiario argentino
+2. Conclusiones principales sobre las cotizaciones
+3. Recomendaciones para diferentes tipos de usuarios
+4. Perspectivas para el próximo período
+
+Formato: Máximo 3 párrafos, lenguaje claro y directo, enfocado en cotizaciones del dólar."""
+
+
+def _price_arrays(dolar_data: List[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Extrae casas, precios de compra y precios de venta como arrays de NumPy"""
+    casas = np.array([c.get('casa') for c in dolar_data], dtype=object)
+    compras = np.array([c.get('compra', 0) for c in dolar_data], dtype=np.float64)
+    ventas = np.array([c.get('venta', 0) for c in dolar_data], dtype=np.float64)
+    return casas, compras, ventas
+
+
+def _compute_gaps(ventas: np.ndarray, oficial_venta: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Calcula las brechas de cada precio de venta contra el oficial (monto y %; NaN si no se pueden calcular)"""
+    gap_amount = ventas - oficial_venta
+    # Sin precio oficial válido no hay brecha porcentual: NaN en lugar de dividir por cero
+    if np.isfinite(oficial_venta) and oficial_venta > 0:
+        gap_pct = gap_amount / oficial_venta * 100.0
+    else:
+        gap_pct = np.full_like(gap_amount, np.nan)
+    return gap_amount, gap_pct
+
+
+def _compute_spreads(ventas: np.ndarray, compras: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Calcula los spreads compra/venta de cada cotización (monto y %; NaN si falta algún precio)"""
+    spread = ventas - compras
+    # Spread porcentual 0 cuando no hay precio de compra, sin dividir por cero
+    spread_pct = np.divide(spread, compras, out=np.zeros_like(spread), where=compras > 0) * 100.0
+    return spread, spread_pct
+
+
+class DolarAnalystAgent(BaseAnalystAgent):
     """Agente especializado en análisis de datos de DolarAPI"""
     
+    report_prefix = "dolar_report"
+    report_label = "Reporte de DolarAPI"
+    
     def __init__(self, api_key: str):
         """Inicializa el agente analista de DolarAPI"""
-        self.api_key = api_key
-        
-        # Configurar el modelo Gemini
-        model_client = OpenAIChatCompletionClient(
-            api_key=api_key,
-            model="gemini-2.5-flash-lite",
-            model_info=ModelInfo(
-                vision=True, 
-                function_calling=True, 
-                json_output=True, 
-                family="unknown", 
-                structured_output=True
-            )
-        )
-        
-        self.assistant_agent = AssistantAgent(
-            name="dolar_analyst",
-            model_client=model_client
-        )
+        super().__init__(api_key, "dolar_analyst", SYSTEM_PROMPT)
     
     async def analyze_dolar_data(self, data_file_path: str) -> Dict:
-        """Analiza los datos de DolarAPI y genera insights"""
+        """Analiza los datos de DolarAPI guardados en un archivo y genera insights"""
         try:
             # Cargar datos del archivo
-            with open(data_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
+            data = await asyncio.to_thread(load_json_sync, data_file_path)
+        except Exception as e:
+            print(f"Error analizando datos de DolarAPI: {e}")
+            return {}
+        
+        return await self.analyze_data(data)
+    
+    async def analyze_data(self, data: Dict) -> Dict:
+        """Analiza los datos de DolarAPI ya cargados en memoria y genera insights"""
+        # Un único instante de referencia para todo el reporte
+        run_ts = datetime.now().isoformat()
+        
+        try:
             # Verificar que son datos de DolarAPI
             if data.get('data_type') != 'dolar_cotizations_only':
                 print("Advertencia: Los datos no parecen ser específicos de DolarAPI")
@@ -54,23 +127,34 @@ class DolarAnalystAgent:
             if not dolar_data:
                 return {'error': 'No se encontraron datos de DolarAPI'}
             
-            # Análisis de las diferentes cotizaciones
-            cotizations_analysis = await self._analyze_cotizations(dolar_data)
+            # Serializar una sola vez los datos que comparten varios prompts
+            dolar_json = to_json(dolar_data)
+            
+            # Los análisis son independientes entre sí: se ejecutan en paralelo
+            results = await asyncio.gather(
+                self._analyze_cotizations(dolar_data, dolar_json),
+                self._analyze_exchange_gaps(dolar_data),
+                self._analyze_trends(dolar_data),
+                return_exceptions=True
+            )
             
-            # Análisis de brechas cambiarias
-            gaps_analysis = await self._analyze_exchange_gaps(dolar_data)
+            # Reemplazar las ramas que fallaron por un resultado de error
+            cotizations_analysis, gaps_analysis, trends_analysis = [
+                {'error': str(r)} if isinstance(r, Exception) else r
+                for r in results
+            ]
             
-            # Análisis de tendencias
-            trends_analysis = await self._analyze_trends(dolar_data)
+            # El resumen se arma con los resultados de los análisis, no con los datos crudos
+            summary = await self._generate_executive_summary(gaps_analysis, trends_analysis)
             
             # Generar reporte consolidado
             report = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': run_ts,
                 'data_source': 'DolarAPI',
                 'cotizations_analysis': cotizations_analysis,
                 'gaps_analysis': gaps_analysis,
                 'trends_analysis': trends_analysis,
-                'summary': await self._generate_executive_summary(dolar_data)
+                'summary': summary
             }
             
             return report
@@ -79,24 +163,12 @@ class DolarAnalystAgent:
             print(f"Error analizando datos de DolarAPI: {e}")
             return {}
     
-    async def _analyze_cotizations(self, dolar_data: List[Dict]) -> Dict:
+    async def _analyze_cotizations(self, dolar_data: List[Dict], dolar_json: str) -> Dict:
         """Analiza las diferentes cotizaciones del dólar"""
         try:
-            analysis_prompt = f"""
-            Analiza las siguientes cotizaciones del dólar en Argentina obtenidas de DolarAPI:
+            analysis_prompt = build_prompt(COTIZATIONS_PROMPT, dolar_json)
             
-            {json.dumps(dolar_data, indent=2, ensure_ascii=False)}
-            
-            Proporciona un análisis detallado que incluya:
-            1. Interpretación de cada tipo de cotización (oficial, blue, bolsa, etc.)
-            2. Diferencias entre las cotizaciones y su significado
-            3. Factores que influyen en cada tipo de cotización
-            4. Implicaciones para diferentes tipos de usuarios (inversores, empresas, consumidores)
-            5. Recomendaciones específicas para cada tipo de cotización
-            """
-            
-            result = await self.assistant_agent.run(task=analysis_prompt)
-            analysis = result.messages[-1].content
+            analysis = await self._cached_run(analysis_prompt)
             
             return {
                 'total_cotizations': len(dolar_data),
@@ -111,44 +183,34 @@ class DolarAnalystAgent:
     async def _analyze_exchange_gaps(self, dolar_data: List[Dict]) -> Dict:
         """Analiza las brechas cambiarias entre diferentes cotizaciones"""
         try:
-            # Calcular brechas
+            # Calcular todas las brechas respecto del oficial en una sola operación
+            casas, _, ventas = _price_arrays(dolar_data)
+            oficial_mask = casas == 'oficial'
+            
             gaps = {}
             oficial = None
             
-            for cotization in dolar_data:
-                if cotization.get('casa') == 'oficial':
-                    oficial = cotization
-                    break
-            
-            if oficial:
-                oficial_venta = oficial.get('venta', 0)
-                for cotization in dolar_data:
-                    if cotization.get('casa') != 'oficial':
-                        casa = cotization.get('casa')
-                        venta = cotization.get('venta', 0)
-                        gap = ((venta - oficial_venta) / oficial_venta) * 100
-                        gaps[casa] = {
-                            'gap_percentage': round(gap, 2),
-                            'gap_amount': round(venta - oficial_venta, 2),
-                            'cotization': cotization
-                        }
-            
-            analysis_prompt = f"""
-            Analiza las brechas cambiarias en Argentina basándote en estos datos:
-            
-            Cotización Oficial: {oficial.get('venta') if oficial else 'N/A'}
-            Brechas calculadas: {json.dumps(gaps, indent=2, ensure_ascii=False)}
-            
-            Proporciona:
-            1. Interpretación de las brechas cambiarias
-            2. Factores que generan estas diferencias
-            3. Impacto económico de las brechas
-            4. Perspectivas sobre la convergencia o divergencia
-            5. Recomendaciones para diferentes actores económicos
-            """
+            if oficial_mask.any():
+                oficial_idx = int(np.argmax(oficial_mask))
+                oficial = dolar_data[oficial_idx]
+                gaps_amount, gaps_percentage = _compute_gaps(ventas, ventas[oficial_idx])
+                
+                # Las brechas que no se pudieron calcular (precios faltantes o en cero) se omiten
+                valid = ~oficial_mask & np.isfinite(gaps_amount) & np.isfinite(gaps_percentage)
+                for i in np.flatnonzero(valid):
+                    gaps[casas[i]] = {
+                        'gap_percentage': round(float(gaps_percentage[i]), 2),
+                        'gap_amount': round(float(gaps_amount[i]), 2),
+                        'cotization': dolar_data[i]
+                    }
+            
+            analysis_prompt = build_prompt(
+                GAPS_PROMPT,
+                f"Cotización Oficial: {oficial.get('venta') if oficial else 'N/A'}\n"
+                f"Brechas calculadas: {to_json(gaps)}"
+            )
             
-            result = await self.assistant_agent.run(task=analysis_prompt)
-            analysis = result.messages[-1].content
+            analysis = await self._cached_run(analysis_prompt)
             
             return {
                 'oficial_cotization': oficial,
@@ -163,34 +225,24 @@ class DolarAnalystAgent:
     async def _analyze_trends(self, dolar_data: List[Dict]) -> Dict:
         """Analiza tendencias en las cotizaciones"""
         try:
-            # Extraer precios para análisis
+            # Extraer precios y calcular los spreads de todas las cotizaciones a la vez
+            casas, compras, ventas = _price_arrays(dolar_data)
+            spreads, spreads_percentage = _compute_spreads(ventas, compras)
+            
+            # Las cotizaciones con precios faltantes no tienen spread: se omiten
             prices = {}
-            for cotization in dolar_data:
-                casa = cotization.get('casa')
-                compra = cotization.get('compra', 0)
-                venta = cotization.get('venta', 0)
-                prices[casa] = {
-                    'compra': compra,
-                    'venta': venta,
-                    'spread': round(venta - compra, 2),
-                    'spread_percentage': round(((venta - compra) / compra) * 100, 2) if compra > 0 else 0
+            for i in np.flatnonzero(np.isfinite(spreads)):
+                cotization = dolar_data[i]
+                prices[casas[i]] = {
+                    'compra': cotization.get('compra', 0),
+                    'venta': cotization.get('venta', 0),
+                    'spread': round(float(spreads[i]), 2),
+                    'spread_percentage': round(float(spreads_percentage[i]), 2)
                 }
             
-            analysis_prompt = f"""
-            Analiza las tendencias del mercado cambiario argentino basándote en estos datos:
-            
-            Precios y spreads: {json.dumps(prices, indent=2, ensure_ascii=False)}
+            analysis_prompt = build_prompt(TRENDS_PROMPT, f"Precios y spreads: {to_json(prices)}")
             
-            Proporciona:
-            1. Análisis de los spreads entre compra y venta
-            2. Identificación de patrones en las cotizaciones
-            3. Factores que influyen en las tendencias
-            4. Perspectivas a corto y mediano plazo
-            5. Recomendaciones estratégicas
-            """
-            
-            result = await self.assistant_agent.run(task=analysis_prompt)
-            analysis = result.messages[-1].content
+            analysis = await self._cached_run(analysis_prompt)
             
             return {
                 'prices_analysis': prices,
@@ -201,65 +253,50 @@ class DolarAnalystAgent:
             print(f"Error analizando tendencias: {e}")
             return {'error': str(e)}
     
-    async def _generate_executive_summary(self, dolar_data: List[Dict]) -> str:
-        """Genera un resumen ejecutivo del análisis de DolarAPI"""
+    async def _generate_executive_summary(self, gaps_analysis: Dict, trends_analysis: Dict) -> str:
+        """Genera un resumen ejecutivo del análisis de DolarAPI a partir de sus indicadores clave"""
+        if not gaps_analysis.get('gaps') and not trends_analysis.get('prices_analysis'):
+            return NO_DATA_SUMMARY
+        
         try:
-            summary_prompt = f"""
-            Genera un resumen ejecutivo del análisis de cotizaciones del dólar en Argentina:
-            
-            Datos de DolarAPI:
-            {json.dumps(dolar_data, indent=2, ensure_ascii=False)}
-            
-            El resumen debe incluir:
-            1. Puntos clave del mercado cambiario argentino
-            2. Conclusiones principales sobre las cotizaciones
-            3. Recomendaciones para diferentes tipos de usuarios
-            4. Perspectivas para el próximo período
-            
-            Formato: Máximo 3 párrafos, lenguaje claro y directo, enfocado en cotizaciones del dólar.
-            """
+            oficial = gaps_analysis.get('oficial_cotization') or {}
+            key_points = {
+                'oficial_venta': oficial.get('venta'),
+                'brechas_porcentuales': {
+                    casa: gap.get('gap_percentage')
+                    for casa, gap in gaps_analysis.get('gaps', {}).items()
+                },
+                'precios_y_spreads': trends_analysis.get('prices_analysis', {})
+            }
+            summary_prompt = build_prompt(SUMMARY_PROMPT, to_json(key_points))
             
-            result = await self.assistant_agent.run(task=summary_prompt)
-            return result.messages[-1].content
+            return await self._cached_run(summary_prompt)
             
         except Exception as e:
             print(f"Error generando resumen ejecutivo: {e}")
             return "No se pudo generar el resumen ejecutivo."
     
-    async def save_report(self, report: Dict, filename: str = None) -> str:
-        """Guarda el reporte de análisis en un archivo"""
-        if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"dolar_report_{timestamp}.json"
-        
-        # Asegurar que el directorio existe
-        reports_dir = "reports"
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir, exist_ok=True)
-        
-        filepath = os.path.join(reports_dir, filename)
-        
-        try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(report, f, indent=2, ensure_ascii=False)
-            
-            print(f"Reporte de DolarAPI guardado en: {filepath}")
-            return filepath
-            
-        except Exception as e:
-            print(f"Error guardando reporte: {e}")
-            return ""
-    
     async def run(self, data_file_path: str) -> str:
-        """Ejecuta el agente analista de DolarAPI"""
+        """Ejecuta el agente analista de DolarAPI sobre un archivo de datos"""
         print("Iniciando Dolar Analyst Agent...")
         
         # Analizar datos de DolarAPI
-        report = await self.analyze_dolar_data(data_file_path)
+        return await self._finish(await self.analyze_dolar_data(data_file_path))
+    
+    async def run_from_dict(self, data: Dict) -> str:
+        """Ejecuta el agente analista de DolarAPI sobre datos en memoria, sin pasar por disco"""
+        print("Iniciando Dolar Analyst Agent...")
         
+        return await self._finish(await self.analyze_data(data))
+    
+    async def _finish(self, report: Dict) -> str:
+        """Guarda el reporte generado y devuelve su ruta ("" si el análisis falló)"""
         if report:
             # Guardar reporte
-            filepath = await self.save_report(report)
+            # Reutilizar el instante del reporte para el nombre del archivo (los reportes de error no lo traen)
+            timestamp = report.get('timestamp')
+            run_ts = datetime.fromisoformat(timestamp) if timestamp else datetime.now()
+            filepath = await self.save_report(report, timestamp=run_ts)
             
             print("Analisis de DolarAPI completado exitosamente:")
             print(f"Reporte guardado en: {filepath}")
@@ -285,18 +322,26 @@ async def main():
         print("No se encontro el directorio de datos")
         return
     
-    data_files = [f for f in os.listdir(data_dir) if f.startswith('dolar_data_') and f.endswith('.json')]
-    if not data_files:
+    # Usar el archivo más reciente (el nombre lleva el timestamp, basta con el máximo)
+    latest_file = None
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith('dolar_data_') and name.endswith('.json') and (latest_file is None or name > latest_file):
+                latest_file = name
+    
+    if latest_file is None:
         print("No se encontraron archivos de datos de DolarAPI")
         return
     
-    # Usar el archivo más reciente
-    latest_file = sorted(data_files)[-1]
     data_file_path = os.path.join(data_dir, latest_file)
     
     # Crear y ejecutar el agente
     analyst = DolarAnalystAgent(api_key)
-    result = await analyst.run(data_file_path)
+    try:
+        result = await analyst.run(data_file_path)
+    finally:
+        await close_model_clients()
     
     if result:
         print(f"Dolar Analyst Agent completado. Reporte guardado en: {result}")
@@ -305,4 +350,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop es opcional (no existe en Windows): si está instalado se usa su event loop
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    
+    (uvloop.run if uvloop else asyncio.run)(main())
@@ -4,108 +4,227 @@ Recolector de datos de DolarAPI para obtener cotizaciones del dólar en Argentin
 """
 
 import requests
+import asyncio
+import contextlib
 import csv
+import functools
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
-import json
+from typing import List, Dict, Optional
+
+import httpx
+import orjson
+from requests.adapters import HTTPAdapter
+
+# Los mensajes de progreso van a logging (nivel DEBUG) para no escribir en stdout en cada consulta
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Cabeceras de todas las consultas: conexión persistente. Accept-Encoding queda el de cada
+# cliente (requests/httpx), que ya pide gzip y suma br/zstd si esos paquetes están instalados
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Connection': 'keep-alive'
+}
+
+# Columnas del CSV histórico, en el orden en que se escriben las filas
+CSV_FIELDNAMES = (
+    'fecha_consulta',
+    'moneda',
+    'casa',
+    'nombre',
+    'compra',
+    'venta',
+    'fecha_actualizacion'
+)
+
+# Buffer de escritura del CSV histórico: todas las filas de una consulta salen en un solo write
+CSV_BUFFER_SIZE = 1 << 20
+
+
+@functools.lru_cache(maxsize=None)
+def get_session() -> requests.Session:
+    """Devuelve la sesión HTTP compartida por todos los recolectores del proceso"""
+    # Una sola sesión mantiene viva la conexión TCP/TLS con DolarAPI entre consultas
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    
+    # DolarAPI es un único host: un pool chico alcanza
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+async def _fetch(client: httpx.AsyncClient, url: str) -> List[Dict]:
+    """Descarga un endpoint de DolarAPI y devuelve siempre una lista de cotizaciones"""
+    response = await client.get(url)
+    response.raise_for_status()
+    
+    # /dolares devuelve una lista, /dolares/<casa> una sola cotización
+    data = orjson.loads(response.content)
+    return data if isinstance(data, list) else [data]
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_iso(fecha: str) -> str:
+    """Devuelve la hora (HH:MM) de una fecha ISO; las cotizaciones suelen compartir la misma fecha"""
+    try:
+        return datetime.fromisoformat(fecha.replace('Z', '+00:00')).strftime('%H:%M')
+    except (ValueError, AttributeError):
+        return fecha
 
 
 class DolarAPICollector:
     """Recolector de datos de la API de DolarAPI"""
     
-    def __init__(self):
-        """Inicializa el recolector"""
+    def __init__(self, verbose: bool = False):
+        """Inicializa el recolector (verbose: mostrar la tabla de cotizaciones al ejecutar run)"""
+        self.verbose = verbose
         self.api_url = "https://dolarapi.com/v1/dolares"
         self.csv_file = "dolar_historico.csv"
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.session = get_session()
+        
+        # Validadores de la última respuesta para consultas condicionales: si las
+        # cotizaciones no cambiaron, DolarAPI responde 304 sin cuerpo
+        self._etag = None
+        self._last_modified = None
+        self._last_data: List[Dict] = []
+        self.not_modified = False
     
     def get_dolar_data(self) -> List[Dict]:
         """Obtiene los datos de cotización del dólar desde la API"""
         try:
-            print(f"Obteniendo datos de: {self.api_url}")
-            response = self.session.get(self.api_url, timeout=10)
+            logger.debug("Obteniendo datos de: %s", self.api_url)
+            headers = {}
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+            
+            response = self.session.get(self.api_url, headers=headers, timeout=10)
+            
+            # Sin cambios desde la consulta anterior: se reutilizan los datos ya obtenidos
+            self.not_modified = response.status_code == 304
+            if self.not_modified:
+                logger.debug("Las cotizaciones no cambiaron desde la última consulta")
+                return self._last_data
+            
             response.raise_for_status()
             
-            data = response.json()
-            print(f"Datos obtenidos exitosamente: {len(data)} cotizaciones")
+            # Parsear directamente los bytes de la respuesta, sin decodificar a str antes
+            data = orjson.loads(response.content)
+            self._etag = response.headers.get('ETag')
+            self._last_modified = response.headers.get('Last-Modified')
+            self._last_data = data
+            logger.debug("Datos obtenidos exitosamente: %d cotizaciones", len(data))
             return data
             
         except requests.exceptions.RequestException as e:
-            print(f"Error obteniendo datos de la API: {e}")
+            logger.error("Error obteniendo datos de la API: %s", e)
             return []
-        except json.JSONDecodeError as e:
-            print(f"Error decodificando JSON: {e}")
+        except orjson.JSONDecodeError as e:
+            logger.error("Error decodificando JSON: %s", e)
             return []
         except Exception as e:
-            print(f"Error inesperado: {e}")
+            logger.error("Error inesperado: %s", e)
+            return []
+    
+    async def get_dolar_data_async(self, urls: Optional[List[str]] = None,
+                                   client: Optional[httpx.AsyncClient] = None) -> List[Dict]:
+        """Obtiene cotizaciones de uno o varios endpoints en paralelo
+        
+        client: cliente HTTP de larga vida del llamador, para reutilizar sus conexiones
+        entre consultas; sin él se abre uno solo para esta consulta y se cierra al terminar.
+        """
+        urls = urls or [self.api_url]
+        
+        try:
+            logger.debug("Obteniendo datos de: %s", ', '.join(urls))
+            if client is None:
+                client_context = httpx.AsyncClient(
+                    headers=DEFAULT_HEADERS,
+                    timeout=10,
+                    limits=httpx.Limits(max_connections=8, keepalive_expiry=30)
+                )
+            else:
+                # El cliente del llamador no se cierra: lo sigue usando después
+                client_context = contextlib.nullcontext(client)
+            
+            async with client_context as client:
+                results = await asyncio.gather(*(_fetch(client, url) for url in urls), return_exceptions=True)
+            
+            data = []
+            for url, result in zip(urls, results):
+                if isinstance(result, Exception):
+                    logger.error("Error obteniendo datos de %s: %s", url, result)
+                else:
+                    data.extend(result)
+            
+            logger.debug("Datos obtenidos exitosamente: %d cotizaciones", len(data))
+            return data
+        
+        except Exception as e:
+            logger.error("Error inesperado: %s", e)
             return []
     
     def save_to_csv(self, data: List[Dict]) -> bool:
         """Guarda los datos en un archivo CSV"""
         if not data:
-            print("No hay datos para guardar")
+            logger.debug("No hay datos para guardar")
             return False
         
         try:
             # Verificar si el archivo existe para determinar si necesitamos headers
             file_exists = os.path.exists(self.csv_file)
             
-            with open(self.csv_file, 'a', newline='', encoding='utf-8') as csvfile:
-                fieldnames = [
-                    'fecha_consulta',
-                    'moneda',
-                    'casa',
-                    'nombre',
-                    'compra',
-                    'venta',
-                    'fecha_actualizacion'
-                ]
-                
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            with open(self.csv_file, 'a', newline='', encoding='utf-8', buffering=CSV_BUFFER_SIZE) as csvfile:
+                writer = csv.writer(csvfile)
                 
                 # Escribir headers solo si el archivo no existe
                 if not file_exists:
-                    writer.writeheader()
-                    print(f"Archivo CSV creado: {self.csv_file}")
+                    writer.writerow(CSV_FIELDNAMES)
+                    logger.debug("Archivo CSV creado: %s", self.csv_file)
                 
                 # Agregar timestamp de consulta
                 consulta_timestamp = datetime.now().isoformat()
                 
-                # Escribir cada registro
-                for item in data:
-                    row = {
-                        'fecha_consulta': consulta_timestamp,
-                        'moneda': item.get('moneda', ''),
-                        'casa': item.get('casa', ''),
-                        'nombre': item.get('nombre', ''),
-                        'compra': item.get('compra', ''),
-                        'venta': item.get('venta', ''),
-                        'fecha_actualizacion': item.get('fechaActualizacion', '')
-                    }
-                    writer.writerow(row)
+                # Armar todas las filas (en el orden de CSV_FIELDNAMES) y escribirlas en una sola llamada;
+                # g es el item.get de cada cotización, resuelto una sola vez por fila
+                rows = [
+                    (
+                        consulta_timestamp,
+                        g('moneda', ''),
+                        g('casa', ''),
+                        g('nombre', ''),
+                        g('compra', ''),
+                        g('venta', ''),
+                        g('fechaActualizacion', '')
+                    )
+                    for g in (item.get for item in data)
+                ]
+                writer.writerows(rows)
                 
-                print(f"Datos guardados en CSV: {len(data)} registros")
+                logger.debug("Datos guardados en CSV: %d registros", len(data))
                 return True
                 
         except Exception as e:
-            print(f"Error guardando datos en CSV: {e}")
+            logger.error("Error guardando datos en CSV: %s", e)
             return False
     
     def save_to_json(self, data: List[Dict]) -> bool:
         """Guarda los datos en un archivo JSON con timestamp"""
         if not data:
-            print("No hay datos para guardar")
+            logger.debug("No hay datos para guardar")
             return False
         
         try:
             # Crear directorio data si no existe
             data_dir = "data"
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir, exist_ok=True)
+            os.makedirs(data_dir, exist_ok=True)
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             json_file = f"dolar_data_{timestamp}.json"
@@ -119,14 +238,14 @@ class DolarAPICollector:
                 'datos': data
             }
             
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2, ensure_ascii=False)
+            with open(json_path, 'wb') as f:
+                f.write(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
             
-            print(f"Datos guardados en JSON: {json_file}")
+            logger.debug("Datos guardados en JSON: %s", json_file)
             return True
             
         except Exception as e:
-            print(f"Error guardando datos en JSON: {e}")
+            logger.error("Error guardando datos en JSON: %s", e)
             return False
     
     def display_data(self, data: List[Dict]):
@@ -148,14 +267,7 @@ class DolarAPICollector:
             fecha = item.get('fechaActualizacion', 'N/A')
             
             # Formatear fecha para mostrar solo la parte relevante
-            if fecha != 'N/A':
-                try:
-                    fecha_obj = datetime.fromisoformat(fecha.replace('Z', '+00:00'))
-                    fecha_str = fecha_obj.strftime('%H:%M')
-                except:
-                    fecha_str = fecha
-            else:
-                fecha_str = 'N/A'
+            fecha_str = _parse_iso(fecha) if fecha != 'N/A' else 'N/A'
             
             print(f"{casa:<20} {compra:<10} {venta:<10} {fecha_str}")
         
@@ -169,15 +281,18 @@ class DolarAPICollector:
         # Obtener datos
         data = self.get_dolar_data()
         
-        if data:
-            # Mostrar datos
-            self.display_data(data)
+        if data and self.not_modified:
+            print("\nSin cotizaciones nuevas: no se generan archivos")
+        elif data:
+            # Mostrar la tabla solo si se pidió explícitamente
+            if self.verbose:
+                self.display_data(data)
             
-            # Guardar en CSV
-            csv_success = self.save_to_csv(data)
-            
-            # Guardar en JSON
-            json_success = self.save_to_json(data)
+            # Guardar en CSV y JSON en paralelo: escriben archivos distintos
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                csv_future = executor.submit(self.save_to_csv, data)
+                json_future = executor.submit(self.save_to_json, data)
+                csv_success, json_success = csv_future.result(), json_future.result()
             
             if csv_success and json_success:
                 print("\nProceso completado exitosamente!")
@@ -192,7 +307,11 @@ class DolarAPICollector:
 
 def main():
     """Función principal"""
-    collector = DolarAPICollector()
+    # Ejecutado desde la línea de comandos se muestran el progreso y la tabla de cotizaciones
+    logging.basicConfig(format='%(message)s')
+    logger.setLevel(logging.DEBUG)
+    
+    collector = DolarAPICollector(verbose=True)
     collector.run()
 
 
@@ -3,11 +3,16 @@
 Generador de datos mock para testing del sistema multiagente
 """
 
-import json
 import os
 from datetime import datetime
 from typing import Dict, List
-import random
+
+import numpy as np
+import orjson
+
+# Formateadores reutilizados para todos los precios y variaciones
+_format_price = '{:,.2f}'.format
+_format_change = '{:+.2f}%'.format
 
 
 class MockDataGenerator:
@@ -28,48 +33,60 @@ class MockDataGenerator:
             'HARG': 560.90,
             'LOMA': 890.15
         }
+        
+        # Símbolos y precios base como secuencias paralelas, para calcular todas las acciones a la vez
+        self._syms = tuple(self.argentine_stocks)
+        self._bases = np.array([self.base_prices[s] for s in self._syms], dtype=np.float64)
+        
+        # Generador propio y límites de variación (%) de cada valor: MERVAL, acciones y USD/ARS,
+        # para sortear todas las variaciones con una sola llamada
+        self._rng = np.random.default_rng()
+        self._change_limits = np.array([3.0] + [5.0] * len(self._syms) + [2.0])
     
     def generate_mock_data(self) -> Dict:
         """Genera datos financieros mock"""
+        # Un único instante para todo el lote; el mismo string se comparte entre todos los registros
         timestamp = datetime.now().isoformat()
         
+        # Variaciones porcentuales de todos los valores en una sola llamada al generador
+        changes = self._rng.uniform(-self._change_limits, self._change_limits)
+        
         # Generar datos del MERVAL
         merval_base = 1200000.0
-        merval_change = random.uniform(-3.0, 3.0)
+        merval_change = float(changes[0])
         merval_price = merval_base * (1 + merval_change / 100)
         
         merval_data = {
             'index': 'MERVAL',
-            'price': f"{merval_price:,.2f}",
-            'change': f"{merval_change:+.2f}%",
+            'price': _format_price(merval_price),
+            'change': _format_change(merval_change),
             'timestamp': timestamp,
             'source': 'mock_data'
         }
         
-        # Generar datos de acciones individuales
-        stocks_data = []
-        for symbol in self.argentine_stocks:
-            base_price = self.base_prices[symbol]
-            change_percent = random.uniform(-5.0, 5.0)
-            new_price = base_price * (1 + change_percent / 100)
-            
-            stock_data = {
+        # Generar datos de acciones individuales: variaciones y precios de todas en una operación
+        stock_changes = changes[1:-1]
+        prices = self._bases * (1 + stock_changes / 100.0)
+        
+        stocks_data = [
+            {
                 'symbol': symbol,
-                'price': f"{new_price:,.2f}",
-                'change': f"{change_percent:+.2f}%",
+                'price': _format_price(new_price),
+                'change': _format_change(change_percent),
                 'timestamp': timestamp,
                 'source': 'mock_data'
             }
-            stocks_data.append(stock_data)
+            for symbol, new_price, change_percent in zip(self._syms, prices.tolist(), stock_changes.tolist())
+        ]
         
         # Generar datos de divisas
         usd_ars_base = 1200.0
-        usd_ars_change = random.uniform(-2.0, 2.0)
+        usd_ars_change = float(changes[-1])
         usd_ars_price = usd_ars_base * (1 + usd_ars_change / 100)
         
         currency_data = {
             'pair': 'USD/ARS',
-            'price': f"{usd_ars_price:,.2f}",
+            'price': _format_price(usd_ars_price),
             'timestamp': timestamp,
             'source': 'mock_data'
         }
@@ -85,19 +102,21 @@ class MockDataGenerator:
     def save_mock_data(self, data: Dict, filename: str = None) -> str:
         """Guarda los datos mock en un archivo JSON"""
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Nombrar el archivo con el instante en que se generaron los datos
+            generated_at = data.get('generated_at')
+            now = datetime.fromisoformat(generated_at) if generated_at else datetime.now()
+            timestamp = now.strftime("%Y%m%d_%H%M%S")
             filename = f"mock_stock_data_{timestamp}.json"
         
         # Asegurar que el directorio existe
         data_dir = "data"
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir, exist_ok=True)
+        os.makedirs(data_dir, exist_ok=True)
         
         filepath = os.path.join(data_dir, filename)
         
         try:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
             
             print(f"Datos mock guardados en: {filepath}")
             return filepath
@@ -4,26 +4,99 @@ PDF Generator Agent para crear reportes PDF con gráficos de cotizaciones del d
 """
 
 import asyncio
+import contextlib
+import functools
 import json
 import os
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import pandas as pd
-import seaborn as sns
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from typing import Dict, List, Optional, Tuple
+import matplotlib
+# Backend sin interfaz gráfica: los gráficos solo se guardan como PNG. Se fija antes de que
+# seaborn cargue pyplot; este módulo no usa pyplot ni su registro global de figuras
+matplotlib.use('Agg')
+import matplotlib.style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import numpy as np
 from io import BytesIO
-import base64
 
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from autogen_core.models import ModelInfo
+# seaborn y reportlab se importan recién donde se usan: son imports pesados
+# que no hacen falta para importar el módulo o referenciar la clase
+
+# Los gráficos se insertan en el PDF a 6x4 pulgadas: se dibujan con la misma proporción
+# y a una resolución acorde, sin renderizar píxeles que después se descartan
+CHART_FIGSIZE = (9, 6)
+CHART_DPI = 150
+
+# Un buffer PNG por hilo, reutilizado entre gráficos (los gráficos se dibujan en paralelo)
+_png_buffers = threading.local()
+
+# Formato de los precios en la tabla de cotizaciones
+_format_ars = '${:,.0f}'.format
+
+
+@functools.cache
+def _ensure_chart_style() -> None:
+    """Aplica el estilo de los gráficos una sola vez por proceso (modifica rcParams globales)"""
+    import seaborn as sns
+    
+    matplotlib.style.use('seaborn-v0_8')
+    sns.set_palette("husl")
+
+
+@functools.cache
+def _pdf_styles() -> Dict:
+    """Estilos de párrafo del PDF, armados una sola vez por proceso"""
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    
+    styles = getSampleStyleSheet()
+    return {
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.darkblue
+        ),
+        'heading': ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=14,
+            spaceAfter=12,
+            textColor=colors.darkblue
+        ),
+        'normal': styles['Normal'],
+        'h3': styles['Heading3']
+    }
+
+
+@contextlib.contextmanager
+def _chart_figure(nrows: int = 1, ncols: int = 1):
+    """Crea una Figure independiente de pyplot y libera sus artistas al terminar, aunque el dibujo falle"""
+    fig = Figure(figsize=CHART_FIGSIZE)
+    FigureCanvasAgg(fig)
+    try:
+        yield fig, fig.subplots(nrows, ncols)
+    finally:
+        fig.clear()
+
+
+def _cotization_columns(cotizations_data: List[Dict]) -> Tuple[List, List, List]:
+    """Extrae nombres, precios de compra y precios de venta recorriendo las cotizaciones una sola vez"""
+    rows = [(c.get('nombre', 'N/A'), c.get('compra', 0), c.get('venta', 0)) for c in cotizations_data]
+    if not rows:
+        return [], [], []
+    nombres, compras, ventas = map(list, zip(*rows))
+    return nombres, compras, ventas
+
+
+def _trim(text: str, limit: int = 1000) -> str:
+    """Recorta un análisis largo antes de armar el párrafo; los textos cortos quedan intactos"""
+    return f"{text[:limit]}..." if len(text) > limit else text
 
 
 class PDFGeneratorAgent:
@@ -31,39 +104,28 @@ class PDFGeneratorAgent:
     
     def __init__(self, api_key: str):
         """Inicializa el agente generador de PDF"""
+        # Los gráficos y el PDF se generan sin consultar al modelo: la API key
+        # se conserva solo por compatibilidad con el orquestador
         self.api_key = api_key
         
-        # Configurar estilo de gráficos
-        plt.style.use('seaborn-v0_8')
-        sns.set_palette("husl")
-        
-        # Configurar el modelo Gemini
-        model_client = OpenAIChatCompletionClient(
-            api_key=api_key,
-            model="gemini-2.5-flash-lite",
-            model_info=ModelInfo(
-                vision=True, 
-                function_calling=True, 
-                json_output=True, 
-                family="unknown", 
-                structured_output=True
-            )
-        )
-        
-        self.assistant_agent = AssistantAgent(
-            name="pdf_generator",
-            model_client=model_client
-        )
+        # Configurar estilo de gráficos (solo la primera instancia lo aplica)
+        _ensure_chart_style()
+    
+    async def prerender_charts(self, cotizations_data: List[Dict]) -> Dict[str, Dict]:
+        """Dibuja por adelantado los gráficos que solo dependen de las cotizaciones (tipo -> gráfico)"""
+        # Con un reporte que solo trae las cotizaciones, los gráficos de brechas y spreads se omiten
+        charts = await self._create_charts({'cotizations_analysis': {'cotizations': cotizations_data}})
+        return {chart['type']: chart for chart in charts}
     
-    async def create_pdf_report(self, report_file_path: str) -> str:
-        """Crea un reporte PDF con gráficos de cotizaciones"""
+    async def create_pdf_report(self, report_file_path: str, prerendered: Optional[Dict[str, Dict]] = None) -> str:
+        """Crea un reporte PDF con gráficos de cotizaciones (prerendered: gráficos ya dibujados por tipo)"""
         try:
             # Cargar reporte de análisis
             with open(report_file_path, 'r', encoding='utf-8') as f:
                 report = json.load(f)
             
             # Crear gráficos
-            charts = await self._create_charts(report)
+            charts = await self._create_charts(report, prerendered)
             
             # Generar PDF
             pdf_file = await self._generate_pdf(report, charts)
@@ -74,30 +136,33 @@ class PDFGeneratorAgent:
             print(f"Error creando reporte PDF: {e}")
             return ""
     
-    async def _create_charts(self, report: Dict) -> List[Dict]:
-        """Crea gráficos basados en los datos del reporte"""
+    async def _create_charts(self, report: Dict, prerendered: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+        """Crea gráficos basados en los datos del reporte, salvo los que ya vienen dibujados"""
         charts = []
+        prerendered = prerendered or {}
         
         try:
-            # Gráfico 1: Cotizaciones del dólar
-            cotizations_chart = await self._create_cotizations_chart(report)
-            if cotizations_chart:
-                charts.append(cotizations_chart)
-            
-            # Gráfico 2: Brechas cambiarias
-            gaps_chart = await self._create_gaps_chart(report)
-            if gaps_chart:
-                charts.append(gaps_chart)
-            
-            # Gráfico 3: Spreads de compra-venta
-            spreads_chart = await self._create_spreads_chart(report)
-            if spreads_chart:
-                charts.append(spreads_chart)
-            
-            # Gráfico 4: Comparación de precios
-            comparison_chart = await self._create_comparison_chart(report)
-            if comparison_chart:
-                charts.append(comparison_chart)
+            builders = (
+                ('cotizations', self._create_cotizations_chart),  # Gráfico 1: Cotizaciones del dólar
+                ('gaps', self._create_gaps_chart),  # Gráfico 2: Brechas cambiarias
+                ('spreads', self._create_spreads_chart),  # Gráfico 3: Spreads de compra-venta
+                ('comparison', self._create_comparison_chart)  # Gráfico 4: Comparación de precios
+            )
+            pending = [(chart_type, build) for chart_type, build in builders if chart_type not in prerendered]
+            
+            # Los gráficos no comparten datos: se dibujan en paralelo, cada uno en su propio hilo
+            drawn = await asyncio.gather(*(build(report) for _, build in pending), return_exceptions=True)
+            by_type = dict(prerendered)
+            by_type.update(zip((chart_type for chart_type, _ in pending), drawn))
+            
+            # Respetar el orden de los gráficos en el PDF
+            results = [by_type.get(chart_type) for chart_type, _ in builders]
+            
+            for chart in results:
+                if isinstance(chart, Exception):
+                    print(f"Error creando gráficos: {chart}")
+                elif chart:
+                    charts.append(chart)
             
         except Exception as e:
             print(f"Error creando gráficos: {e}")
@@ -111,12 +176,26 @@ class PDFGeneratorAgent:
             if not cotizations_data:
                 return None
             
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
+            # Dibujar fuera del event loop
+            chart_data = await asyncio.to_thread(self._draw_cotizations_chart, cotizations_data)
+            
+            return {
+                'type': 'cotizations',
+                'title': 'Cotizaciones del Dólar',
+                'data': chart_data,
+                'description': 'Comparación de precios de compra y venta por tipo de cotización'
+            }
             
+        except Exception as e:
+            print(f"Error creando gráfico de cotizaciones: {e}")
+            return None
+    
+    def _draw_cotizations_chart(self, cotizations_data: List[Dict]) -> bytes:
+        """Dibuja el gráfico de cotizaciones (bloqueante, pensado para asyncio.to_thread)"""
+        # Figure propia en lugar de pyplot: el estado global de pyplot no es seguro entre hilos
+        with _chart_figure(2, 1) as (fig, (ax1, ax2)):
             # Preparar datos
-            nombres = [c.get('nombre', 'N/A') for c in cotizations_data]
-            compras = [c.get('compra', 0) for c in cotizations_data]
-            ventas = [c.get('venta', 0) for c in cotizations_data]
+            nombres, compras, ventas = _cotization_columns(cotizations_data)
             
             # Gráfico de precios de compra
             bars1 = ax1.bar(nombres, compras, color='lightblue', alpha=0.7, label='Compra')
@@ -126,10 +205,7 @@ class PDFGeneratorAgent:
             ax1.grid(True, alpha=0.3)
             
             # Agregar valores en las barras
-            for bar, price in zip(bars1, compras):
-                height = bar.get_height()
-                ax1.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{price}', ha='center', va='bottom', fontsize=10)
+            ax1.bar_label(bars1, fmt='{:,.2f}', padding=2, fontsize=10)
             
             # Gráfico de precios de venta
             bars2 = ax2.bar(nombres, ventas, color='lightcoral', alpha=0.7, label='Venta')
@@ -139,27 +215,12 @@ class PDFGeneratorAgent:
             ax2.grid(True, alpha=0.3)
             
             # Agregar valores en las barras
-            for bar, price in zip(bars2, ventas):
-                height = bar.get_height()
-                ax2.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{price}', ha='center', va='bottom', fontsize=10)
+            ax2.bar_label(bars2, fmt='{:,.2f}', padding=2, fontsize=10)
             
-            plt.tight_layout()
+            fig.tight_layout()
             
-            # Convertir a base64
-            chart_data = await self._chart_to_base64(fig)
-            plt.close(fig)
-            
-            return {
-                'type': 'cotizations',
-                'title': 'Cotizaciones del Dólar',
-                'data': chart_data,
-                'description': 'Comparación de precios de compra y venta por tipo de cotización'
-            }
-            
-        except Exception as e:
-            print(f"Error creando gráfico de cotizaciones: {e}")
-            return None
+            # Convertir a PNG
+            return self._chart_to_png_bytes(fig)
     
     async def _create_gaps_chart(self, report: Dict) -> Optional[Dict]:
         """Crea gráfico de brechas cambiarias"""
@@ -168,12 +229,27 @@ class PDFGeneratorAgent:
             if not gaps_data:
                 return None
             
-            fig, ax = plt.subplots(1, 1, figsize=(12, 6))
+            # Dibujar fuera del event loop
+            chart_data = await asyncio.to_thread(self._draw_gaps_chart, gaps_data)
             
-            # Preparar datos
+            return {
+                'type': 'gaps',
+                'title': 'Brechas Cambiarias',
+                'data': chart_data,
+                'description': 'Diferencias porcentuales respecto al dólar oficial'
+            }
+            
+        except Exception as e:
+            print(f"Error creando gráfico de brechas: {e}")
+            return None
+    
+    def _draw_gaps_chart(self, gaps_data: Dict) -> bytes:
+        """Dibuja el gráfico de brechas (bloqueante, pensado para asyncio.to_thread)"""
+        with _chart_figure(1, 1) as (fig, ax):
+            # Preparar datos: brechas como array y colores según el signo en una sola operación
             casas = list(gaps_data.keys())
-            gaps = [gaps_data[casa]['gap_percentage'] for casa in casas]
-            colors_list = ['red' if gap > 0 else 'green' for gap in gaps]
+            gaps = np.fromiter((gap['gap_percentage'] for gap in gaps_data.values()), dtype=np.float64, count=len(casas))
+            colors_list = np.where(gaps > 0, 'red', 'green').tolist()
             
             # Gráfico de brechas
             bars = ax.bar(casas, gaps, color=colors_list, alpha=0.7)
@@ -183,28 +259,13 @@ class PDFGeneratorAgent:
             ax.grid(True, alpha=0.3)
             ax.axhline(y=0, color='black', linestyle='-', alpha=0.3)
             
-            # Agregar valores en las barras
-            for bar, gap in zip(bars, gaps):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{gap:.2f}%', ha='center', va='bottom' if height > 0 else 'top', fontsize=10)
-            
-            plt.tight_layout()
-            
-            # Convertir a base64
-            chart_data = await self._chart_to_base64(fig)
-            plt.close(fig)
+            # Agregar valores en las barras (bar_label ubica debajo las brechas negativas)
+            ax.bar_label(bars, fmt='{:.2f}%', padding=2, fontsize=10)
             
-            return {
-                'type': 'gaps',
-                'title': 'Brechas Cambiarias',
-                'data': chart_data,
-                'description': 'Diferencias porcentuales respecto al dólar oficial'
-            }
+            fig.tight_layout()
             
-        except Exception as e:
-            print(f"Error creando gráfico de brechas: {e}")
-            return None
+            # Convertir a PNG
+            return self._chart_to_png_bytes(fig)
     
     async def _create_spreads_chart(self, report: Dict) -> Optional[Dict]:
         """Crea gráfico de spreads de compra-venta"""
@@ -213,12 +274,27 @@ class PDFGeneratorAgent:
             if not trends_data:
                 return None
             
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+            # Dibujar fuera del event loop
+            chart_data = await asyncio.to_thread(self._draw_spreads_chart, trends_data)
+            
+            return {
+                'type': 'spreads',
+                'title': 'Spreads de Compra-Venta',
+                'data': chart_data,
+                'description': 'Diferencias entre precios de compra y venta'
+            }
             
+        except Exception as e:
+            print(f"Error creando gráfico de spreads: {e}")
+            return None
+    
+    def _draw_spreads_chart(self, trends_data: Dict) -> bytes:
+        """Dibuja el gráfico de spreads (bloqueante, pensado para asyncio.to_thread)"""
+        with _chart_figure(1, 2) as (fig, (ax1, ax2)):
             # Preparar datos
             casas = list(trends_data.keys())
-            spreads = [trends_data[casa]['spread'] for casa in casas]
-            spreads_pct = [trends_data[casa]['spread_percentage'] for casa in casas]
+            spreads = np.fromiter((p['spread'] for p in trends_data.values()), dtype=np.float64, count=len(casas))
+            spreads_pct = np.fromiter((p['spread_percentage'] for p in trends_data.values()), dtype=np.float64, count=len(casas))
             
             # Gráfico de spreads absolutos
             bars1 = ax1.bar(casas, spreads, color='orange', alpha=0.7)
@@ -228,10 +304,7 @@ class PDFGeneratorAgent:
             ax1.grid(True, alpha=0.3)
             
             # Agregar valores
-            for bar, spread in zip(bars1, spreads):
-                height = bar.get_height()
-                ax1.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{spread:.1f}', ha='center', va='bottom', fontsize=9)
+            ax1.bar_label(bars1, fmt='{:.1f}', padding=2, fontsize=9)
             
             # Gráfico de spreads porcentuales
             bars2 = ax2.bar(casas, spreads_pct, color='purple', alpha=0.7)
@@ -241,27 +314,12 @@ class PDFGeneratorAgent:
             ax2.grid(True, alpha=0.3)
             
             # Agregar valores
-            for bar, spread_pct in zip(bars2, spreads_pct):
-                height = bar.get_height()
-                ax2.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{spread_pct:.2f}%', ha='center', va='bottom', fontsize=9)
-            
-            plt.tight_layout()
+            ax2.bar_label(bars2, fmt='{:.2f}%', padding=2, fontsize=9)
             
-            # Convertir a base64
-            chart_data = await self._chart_to_base64(fig)
-            plt.close(fig)
+            fig.tight_layout()
             
-            return {
-                'type': 'spreads',
-                'title': 'Spreads de Compra-Venta',
-                'data': chart_data,
-                'description': 'Diferencias entre precios de compra y venta'
-            }
-            
-        except Exception as e:
-            print(f"Error creando gráfico de spreads: {e}")
-            return None
+            # Convertir a PNG
+            return self._chart_to_png_bytes(fig)
     
     async def _create_comparison_chart(self, report: Dict) -> Optional[Dict]:
         """Crea gráfico de comparación de precios"""
@@ -270,11 +328,25 @@ class PDFGeneratorAgent:
             if not cotizations_data:
                 return None
             
-            fig, ax = plt.subplots(1, 1, figsize=(14, 8))
+            # Dibujar fuera del event loop
+            chart_data = await asyncio.to_thread(self._draw_comparison_chart, cotizations_data)
+            
+            return {
+                'type': 'comparison',
+                'title': 'Comparación de Precios',
+                'data': chart_data,
+                'description': 'Comparación visual de todas las cotizaciones del dólar'
+            }
             
+        except Exception as e:
+            print(f"Error creando gráfico de comparación: {e}")
+            return None
+    
+    def _draw_comparison_chart(self, cotizations_data: List[Dict]) -> bytes:
+        """Dibuja el gráfico de comparación (bloqueante, pensado para asyncio.to_thread)"""
+        with _chart_figure(1, 1) as (fig, ax):
             # Preparar datos
-            nombres = [c.get('nombre', 'N/A') for c in cotizations_data]
-            ventas = [c.get('venta', 0) for c in cotizations_data]
+            nombres, _, ventas = _cotization_columns(cotizations_data)
             
             # Crear gráfico de barras horizontales
             bars = ax.barh(nombres, ventas, color='steelblue', alpha=0.7)
@@ -283,10 +355,7 @@ class PDFGeneratorAgent:
             ax.grid(True, alpha=0.3, axis='x')
             
             # Agregar valores en las barras
-            for i, (bar, price) in enumerate(zip(bars, ventas)):
-                width = bar.get_width()
-                ax.text(width, bar.get_y() + bar.get_height()/2.,
-                        f'${price:,.0f}', ha='left', va='center', fontsize=10, fontweight='bold')
+            ax.bar_label(bars, fmt='${:,.0f}', padding=3, fontsize=10, fontweight='bold')
             
             # Destacar el dólar oficial
             oficial_idx = next((i for i, n in enumerate(nombres) if 'Oficial' in n), None)
@@ -294,38 +363,34 @@ class PDFGeneratorAgent:
                 bars[oficial_idx].set_color('red')
                 bars[oficial_idx].set_alpha(0.8)
             
-            plt.tight_layout()
-            
-            # Convertir a base64
-            chart_data = await self._chart_to_base64(fig)
-            plt.close(fig)
-            
-            return {
-                'type': 'comparison',
-                'title': 'Comparación de Precios',
-                'data': chart_data,
-                'description': 'Comparación visual de todas las cotizaciones del dólar'
-            }
+            fig.tight_layout()
             
-        except Exception as e:
-            print(f"Error creando gráfico de comparación: {e}")
-            return None
+            # Convertir a PNG
+            return self._chart_to_png_bytes(fig)
     
-    async def _chart_to_base64(self, fig) -> str:
-        """Convierte un gráfico matplotlib a base64"""
+    def _chart_to_png_bytes(self, fig) -> bytes:
+        """Convierte un gráfico matplotlib a los bytes de un PNG"""
         try:
-            buffer = BytesIO()
-            fig.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
+            buffer = getattr(_png_buffers, 'buffer', None)
+            if buffer is None:
+                buffer = _png_buffers.buffer = BytesIO()
             buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.getvalue()).decode()
-            buffer.close()
-            return image_base64
+            buffer.truncate(0)
+            
+            # Compresión zlib mínima: el PDF vuelve a comprimir la imagen de todos modos
+            fig.savefig(buffer, format='png', dpi=CHART_DPI, pil_kwargs={'compress_level': 1})
+            return buffer.getvalue()
         except Exception as e:
-            print(f"Error convirtiendo gráfico a base64: {e}")
-            return ""
+            print(f"Error convirtiendo gráfico a PNG: {e}")
+            return b""
     
     async def _generate_pdf(self, report: Dict, charts: List[Dict]) -> str:
         """Genera el archivo PDF con los gráficos y análisis"""
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Image, Paragraph, Spacer, Table, TableStyle
+        
         try:
             # Crear nombre de archivo
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -333,8 +398,7 @@ class PDFGeneratorAgent:
             
             # Asegurar que el directorio existe
             pdf_dir = "presentations"
-            if not os.path.exists(pdf_dir):
-                os.makedirs(pdf_dir, exist_ok=True)
+            os.makedirs(pdf_dir, exist_ok=True)
             
             filepath = os.path.join(pdf_dir, filename)
             
@@ -342,50 +406,30 @@ class PDFGeneratorAgent:
             doc = SimpleDocTemplate(filepath, pagesize=A4)
             story = []
             
-            # Estilos
-            styles = getSampleStyleSheet()
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=18,
-                spaceAfter=30,
-                alignment=TA_CENTER,
-                textColor=colors.darkblue
-            )
-            
-            heading_style = ParagraphStyle(
-                'CustomHeading',
-                parent=styles['Heading2'],
-                fontSize=14,
-                spaceAfter=12,
-                textColor=colors.darkblue
-            )
+            # Estilos (compartidos entre todos los PDFs del proceso)
+            styles = _pdf_styles()
             
             # Título principal
-            story.append(Paragraph("Reporte de Cotizaciones del Dólar", title_style))
-            story.append(Paragraph(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['Normal']))
+            story.append(Paragraph("Reporte de Cotizaciones del Dólar", styles['title']))
+            story.append(Paragraph(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles['normal']))
             story.append(Spacer(1, 20))
             
             # Resumen ejecutivo
-            story.append(Paragraph("Resumen Ejecutivo", heading_style))
+            story.append(Paragraph("Resumen Ejecutivo", styles['heading']))
             summary = report.get('summary', 'No hay resumen disponible.')
-            story.append(Paragraph(summary, styles['Normal']))
+            story.append(Paragraph(summary, styles['normal']))
             story.append(Spacer(1, 20))
             
             # Datos de cotizaciones
             cotizations_data = report.get('cotizations_analysis', {}).get('cotizations', [])
             if cotizations_data:
-                story.append(Paragraph("Datos de Cotizaciones", heading_style))
+                story.append(Paragraph("Datos de Cotizaciones", styles['heading']))
                 
-                # Crear tabla de datos
+                # Crear tabla de datos: se arma por columnas y se formatea cada columna de una vez
+                nombres, compras, ventas = _cotization_columns(cotizations_data)
+                fechas = [str(cot.get('fechaActualizacion') or 'N/A')[:16] for cot in cotizations_data]
                 table_data = [['Tipo', 'Compra (ARS)', 'Venta (ARS)', 'Actualización']]
-                for cot in cotizations_data:
-                    table_data.append([
-                        cot.get('nombre', 'N/A'),
-                        f"${cot.get('compra', 0):,.0f}",
-                        f"${cot.get('venta', 0):,.0f}",
-                        cot.get('fechaActualizacion', 'N/A')[:16]
-                    ])
+                table_data.extend(map(list, zip(nombres, map(_format_ars, compras), map(_format_ars, ventas), fechas)))
                 
                 table = Table(table_data)
                 table.setStyle(TableStyle([
@@ -402,58 +446,51 @@ class PDFGeneratorAgent:
                 story.append(table)
                 story.append(Spacer(1, 20))
             
-            # Agregar gráficos
+            # Agregar gráficos (los PNG se decodifican al construir el PDF, dentro de doc.build)
             for chart in charts:
-                story.append(Paragraph(chart['title'], heading_style))
-                story.append(Paragraph(chart['description'], styles['Normal']))
+                story.append(Paragraph(chart['title'], styles['heading']))
+                story.append(Paragraph(chart['description'], styles['normal']))
                 story.append(Spacer(1, 10))
                 
-                # Convertir base64 a imagen
                 try:
-                    image_data = base64.b64decode(chart['data'])
-                    img_buffer = BytesIO(image_data)
-                    
-                    # Crear imagen para PDF
-                    img = Image(img_buffer, width=6*inch, height=4*inch)
-                    story.append(img)
+                    story.append(Image(BytesIO(chart['data']), width=6*inch, height=4*inch))
                     story.append(Spacer(1, 20))
-                    
                 except Exception as e:
                     print(f"Error agregando gráfico al PDF: {e}")
-                    story.append(Paragraph("Error al cargar gráfico", styles['Normal']))
+                    story.append(Paragraph("Error al cargar gráfico", styles['normal']))
             
             # Análisis detallado
-            story.append(Paragraph("Análisis Detallado", heading_style))
+            story.append(Paragraph("Análisis Detallado", styles['heading']))
             
             # Análisis de cotizaciones
             cot_analysis = report.get('cotizations_analysis', {}).get('analysis', '')
             if cot_analysis:
-                story.append(Paragraph("Análisis de Cotizaciones", styles['Heading3']))
-                story.append(Paragraph(cot_analysis[:1000] + "...", styles['Normal']))
+                story.append(Paragraph("Análisis de Cotizaciones", styles['h3']))
+                story.append(Paragraph(_trim(cot_analysis), styles['normal']))
                 story.append(Spacer(1, 10))
             
             # Análisis de brechas
             gaps_analysis = report.get('gaps_analysis', {}).get('analysis', '')
             if gaps_analysis:
-                story.append(Paragraph("Análisis de Brechas Cambiarias", styles['Heading3']))
-                story.append(Paragraph(gaps_analysis[:1000] + "...", styles['Normal']))
+                story.append(Paragraph("Análisis de Brechas Cambiarias", styles['h3']))
+                story.append(Paragraph(_trim(gaps_analysis), styles['normal']))
                 story.append(Spacer(1, 10))
             
             # Análisis de tendencias
             trends_analysis = report.get('trends_analysis', {}).get('analysis', '')
             if trends_analysis:
-                story.append(Paragraph("Análisis de Tendencias", styles['Heading3']))
-                story.append(Paragraph(trends_analysis[:1000] + "...", styles['Normal']))
+                story.append(Paragraph("Análisis de Tendencias", styles['h3']))
+                story.append(Paragraph(_trim(trends_analysis), styles['normal']))
             
             # Pie de página
             story.append(Spacer(1, 30))
             story.append(Paragraph("Reporte generado automáticamente por el Sistema Multiagente de Análisis Financiero", 
-                                 styles['Normal']))
+                                 styles['normal']))
             story.append(Paragraph(f"Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 
-                                 styles['Normal']))
+                                 styles['normal']))
             
-            # Construir PDF
-            doc.build(story)
+            # Construir PDF en un hilo: el armado es bloqueante y no debe frenar el event loop
+            await asyncio.to_thread(doc.build, story)
             
             print(f"Reporte PDF generado: {filepath}")
             return filepath
@@ -462,12 +499,12 @@ class PDFGeneratorAgent:
             print(f"Error generando PDF: {e}")
             return ""
     
-    async def run(self, report_file_path: str) -> str:
+    async def run(self, report_file_path: str, prerendered: Optional[Dict[str, Dict]] = None) -> str:
         """Ejecuta el agente generador de PDF"""
         print("Iniciando PDF Generator Agent...")
         
         # Crear reporte PDF
-        pdf_file = await self.create_pdf_report(report_file_path)
+        pdf_file = await self.create_pdf_report(report_file_path, prerendered)
         
         if pdf_file:
             print("Reporte PDF creado exitosamente:")
@@ -492,13 +529,18 @@ async def main():
         print("No se encontro el directorio de reportes")
         return
     
-    report_files = [f for f in os.listdir(reports_dir) if f.startswith('dolar_report_') and f.endswith('.json')]
-    if not report_files:
+    # Usar el archivo más reciente (el nombre lleva el timestamp, basta con el máximo)
+    latest_file = None
+    with os.scandir(reports_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith('dolar_report_') and name.endswith('.json') and (latest_file is None or name > latest_file):
+                latest_file = name
+    
+    if latest_file is None:
         print("No se encontraron archivos de reporte de DolarAPI")
         return
     
-    # Usar el archivo más reciente
-    latest_file = sorted(report_files)[-1]
     report_file_path = os.path.join(reports_dir, latest_file)
     
     # Crear y ejecutar el agente
@@ -4,32 +4,249 @@ Presentation Agent para generar presentaciones con gráficos de datos financiero
 """
 
 import asyncio
+import functools
 import json
 import os
+import re
+import string
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-import pandas as pd
-import seaborn as sns
-from io import BytesIO
-import base64
+import numpy as np
+import orjson
+from io import StringIO
 
 from autogen_agentchat.agents import AssistantAgent
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 from autogen_core.models import ModelInfo
 
+# matplotlib y seaborn se importan recién al dibujar el primer gráfico: son imports pesados
+# que no hacen falta para importar el módulo o referenciar la clase
+
+# Directorio de las presentaciones; los SVG de los gráficos se guardan en su subdirectorio charts/
+PRESENTATIONS_DIR = "Agentes_Inteligentes/MultiAgent/presentations"
+CHARTS_SUBDIR = "charts"
+
+# Máximo de barras del gráfico de acciones: el resto se agrupa en una barra "Otros"
+MAX_STOCK_BARS = 15
+
+# Una Figure por hilo, reutilizada entre gráficos: crearla es caro y los gráficos se dibujan en paralelo
+_figures = threading.local()
+
+# Hoja de estilos de la presentación: no cambia entre reportes. Se escribe una vez como
+# STYLESHEET junto a las presentaciones; solo se incrusta si la presentación es autocontenida
+STYLESHEET = "styles.css"
+_CSS = """
+body {
+    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+    margin: 0;
+    padding: 20px;
+    background-color: #f5f5f5;
+}
+.container {
+    max-width: 1200px;
+    margin: 0 auto;
+    background-color: white;
+    padding: 30px;
+    border-radius: 10px;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+}
+.header {
+    text-align: center;
+    margin-bottom: 40px;
+    border-bottom: 3px solid #2c3e50;
+    padding-bottom: 20px;
+}
+.header h1 {
+    color: #2c3e50;
+    margin: 0;
+    font-size: 2.5em;
+}
+.header p {
+    color: #7f8c8d;
+    margin: 10px 0 0 0;
+    font-size: 1.2em;
+}
+.chart-section {
+    margin: 30px 0;
+    padding: 20px;
+    border: 1px solid #ecf0f1;
+    border-radius: 8px;
+    background-color: #fafafa;
+}
+.chart-title {
+    color: #2c3e50;
+    font-size: 1.5em;
+    margin-bottom: 15px;
+    font-weight: bold;
+}
+.chart-description {
+    color: #7f8c8d;
+    margin-bottom: 20px;
+    font-style: italic;
+}
+.chart-image {
+    text-align: center;
+    margin: 20px 0;
+}
+.chart-image img, .chart-image svg {
+    max-width: 100%;
+    height: auto;
+    border-radius: 5px;
+    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+}
+.summary {
+    background-color: #ecf0f1;
+    padding: 20px;
+    border-radius: 8px;
+    margin-top: 30px;
+}
+.summary h3 {
+    color: #2c3e50;
+    margin-top: 0;
+}
+.insights {
+    background-color: #e8f5e8;
+    padding: 20px;
+    border-radius: 8px;
+    margin-top: 20px;
+    border-left: 4px solid #27ae60;
+}
+.insights h3 {
+    color: #27ae60;
+    margin-top: 0;
+}
+.footer {
+    text-align: center;
+    margin-top: 40px;
+    padding-top: 20px;
+    border-top: 1px solid #ecf0f1;
+    color: #7f8c8d;
+}
+"""
+
+# Esqueleto HTML de la presentación, antes y después de las secciones de gráficos;
+# por reporte solo se sustituyen los campos variables
+_HTML_HEAD = string.Template("""<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Análisis Financiero Argentina - ${title_date}</title>
+    ${style}
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>📊 Análisis Financiero Argentina</h1>
+            <p>Reporte del ${header_date}</p>
+        </div>
+""")
+
+_HTML_FOOT = string.Template("""
+        <div class="summary">
+            <h3>📝 Resumen Ejecutivo</h3>
+            <p>${summary}</p>
+        </div>
+        
+        <div class="insights">
+            <h3>💡 Insights Adicionales</h3>
+            <p>${insights}</p>
+        </div>
+        
+        <div class="footer">
+            <p>Generado automáticamente por el Sistema Multiagente de Análisis Financiero</p>
+            <p>Timestamp: ${generated_at}</p>
+        </div>
+    </div>
+</body>
+</html>
+""")
+
+
+@functools.cache
+def _ensure_chart_style() -> None:
+    """Configura matplotlib y el estilo de los gráficos una sola vez por proceso (modifica rcParams globales)"""
+    import matplotlib
+    # Backend sin interfaz gráfica: los gráficos solo se guardan como imágenes
+    matplotlib.use('Agg')
+    import matplotlib.style
+    import seaborn as sns
+    
+    matplotlib.style.use('seaborn-v0_8')
+    sns.set_palette("husl")
+    # Los gráficos se exportan como SVG: el texto queda como texto y no como trazos, mucho más liviano
+    matplotlib.rcParams['svg.fonttype'] = 'none'
+
+
+def _chart_figure(figsize):
+    """Devuelve la Figure del hilo actual, vacía y con el tamaño pedido"""
+    fig = getattr(_figures, 'fig', None)
+    if fig is None:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        
+        # Constrained layout: los márgenes se ajustan al dibujar, sin la pasada extra de tight_layout()
+        fig = _figures.fig = Figure(layout='constrained')
+        FigureCanvasAgg(fig)
+    else:
+        fig.clear()
+    fig.set_size_inches(figsize)
+    return fig
+
+
+# Ids del SVG y sus referencias (clip-path="url(#...)", xlink:href="#..."): matplotlib repite los
+# mismos ids en cada gráfico, así que al incrustar varios en un HTML se les agrega un prefijo propio
+_SVG_ID_REFS = re.compile(r'(\bid="|url\(#|href="#)')
+
+
+def _ensure_stylesheet() -> None:
+    """Escribe la hoja de estilos compartida por las presentaciones si falta o quedó desactualizada"""
+    path = os.path.join(PRESENTATIONS_DIR, STYLESHEET)
+    try:
+        with open(path, encoding='utf-8') as f:
+            if f.read() == _CSS:
+                return
+    except OSError:
+        pass
+    
+    # Falta o es de una versión anterior de _CSS: se reescribe
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(_CSS)
+
+
+def _parse_price(value) -> float:
+    """Convierte un precio formateado ("1,234.56", "1.234,56", "1234") a float; 0 si no se puede"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    
+    text = str(value).strip()
+    comma, dot = text.rfind(','), text.rfind('.')
+    if comma >= 0 and dot >= 0:
+        # Con ambos separadores, el último es el decimal
+        thousands, decimal = (',', '.') if dot > comma else ('.', ',')
+        text = text.replace(thousands, '').replace(decimal, '.')
+    elif comma >= 0 or dot >= 0:
+        sep = ',' if comma >= 0 else '.'
+        # Un separador repetido, o seguido de exactamente tres dígitos, es de miles
+        if text.count(sep) > 1 or len(text) - text.rfind(sep) - 1 == 3:
+            text = text.replace(sep, '')
+        else:
+            text = text.replace(sep, '.')
+    
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
 
 class PresentationAgent:
     """Agente especializado en generar presentaciones con gráficos"""
     
-    def __init__(self, api_key: str):
-        """Inicializa el agente de presentaciones"""
+    def __init__(self, api_key: str, embed_charts: bool = False):
+        """Inicializa el agente de presentaciones (embed_charts: incrustar los gráficos SVG en el HTML)"""
         self.api_key = api_key
-        
-        # Configurar estilo de gráficos
-        plt.style.use('seaborn-v0_8')
-        sns.set_palette("husl")
+        self.embed_charts = embed_charts
         
         # Configurar el modelo Gemini
         model_client = OpenAIChatCompletionClient(
@@ -49,27 +266,28 @@ class PresentationAgent:
             model_client=model_client
         )
     
-    async def create_financial_presentation(self, report_file_path: str) -> Dict:
-        """Crea una presentación completa con gráficos financieros"""
+    async def create_financial_presentation(self, report_file_path: str, include_html: bool = False) -> Dict:
+        """Crea una presentación completa con gráficos financieros (include_html: incluir además el HTML armado en memoria)"""
         try:
             # Cargar reporte de análisis
             with open(report_file_path, 'r', encoding='utf-8') as f:
                 report = json.load(f)
             
-            # Crear gráficos
-            charts = await self._create_charts(report)
+            # Un único instante para los nombres de los gráficos y de la presentación
+            run_ts = datetime.now()
+            if not self.embed_charts:
+                os.makedirs(os.path.join(PRESENTATIONS_DIR, CHARTS_SUBDIR), exist_ok=True)
             
-            # Generar HTML de presentación
-            html_presentation = await self._generate_html_presentation(report, charts)
+            # Crear gráficos
+            charts = await self._create_charts(report, run_ts.strftime("%Y%m%d_%H%M%S"))
             
             # Generar insights adicionales con Gemini
             insights = await self._generate_presentation_insights(report)
             
             presentation = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': run_ts.isoformat(),
                 'report_data': report,
                 'charts': charts,
-                'html_content': html_presentation,
                 'insights': insights,
                 'metadata': {
                     'total_charts': len(charts),
@@ -78,90 +296,95 @@ class PresentationAgent:
                 }
             }
             
+            # El HTML se escribe directo al archivo en save_presentation; solo se arma en memoria si se pide
+            if include_html:
+                presentation['html_content'] = await self._generate_html_presentation(report, charts)
+            
             return presentation
             
         except Exception as e:
             print(f"Error creando presentación: {e}")
             return {}
     
-    async def _create_charts(self, report: Dict) -> List[Dict]:
-        """Crea gráficos basados en los datos del reporte"""
+    async def _create_charts(self, report: Dict, stamp: str) -> List[Dict]:
+        """Crea gráficos basados en los datos del reporte (stamp: prefijo de los archivos SVG)"""
         charts = []
         
         try:
-            # Gráfico 1: Análisis del MERVAL
-            merval_chart = await self._create_merval_chart(report.get('merval_analysis', {}))
-            if merval_chart:
-                charts.append(merval_chart)
-            
-            # Gráfico 2: Análisis de acciones individuales
-            stocks_chart = await self._create_stocks_chart(report.get('stocks_analysis', {}))
-            if stocks_chart:
-                charts.append(stocks_chart)
-            
-            # Gráfico 3: Análisis de divisas
-            currency_chart = await self._create_currency_chart(report.get('currency_analysis', {}))
-            if currency_chart:
-                charts.append(currency_chart)
-            
-            # Gráfico 4: Tendencias del mercado
-            trends_chart = await self._create_trends_chart(report.get('market_trends', {}))
-            if trends_chart:
-                charts.append(trends_chart)
+            # El estilo se aplica antes de repartir los gráficos entre hilos
+            _ensure_chart_style()
+            
+            # Los gráficos no comparten datos: se dibujan en paralelo, cada uno en su propio hilo
+            results = await asyncio.gather(
+                self._create_merval_chart(report.get('merval_analysis', {}), stamp),  # Gráfico 1: Análisis del MERVAL
+                self._create_stocks_chart(report.get('stocks_analysis', {}), stamp),  # Gráfico 2: Acciones individuales
+                self._create_currency_chart(report.get('currency_analysis', {}), stamp),  # Gráfico 3: Divisas
+                self._create_trends_chart(report.get('market_trends', {}), stamp),  # Gráfico 4: Tendencias del mercado
+                return_exceptions=True
+            )
+            
+            for chart in results:
+                if isinstance(chart, Exception):
+                    print(f"Error creando gráficos: {chart}")
+                elif chart:
+                    charts.append(chart)
             
         except Exception as e:
             print(f"Error creando gráficos: {e}")
         
         return charts
     
-    async def _create_merval_chart(self, merval_data: Dict) -> Optional[Dict]:
+    async def _create_merval_chart(self, merval_data: Dict, stamp: str) -> Optional[Dict]:
         """Crea gráfico del análisis del MERVAL"""
         try:
             if not merval_data or merval_data.get('status') == 'no_data':
                 return None
             
-            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
-            
-            # Gráfico de precio
-            price_str = merval_data.get('price', '0').replace(',', '').replace('.', '')
-            try:
-                price_value = float(price_str)
-            except:
-                price_value = 0
+            price_value = _parse_price(merval_data.get('price', '0'))
             
-            ax1.bar(['MERVAL'], [price_value], color='blue', alpha=0.7)
-            ax1.set_title('Índice MERVAL - Precio Actual', fontsize=14, fontweight='bold')
-            ax1.set_ylabel('Precio')
-            ax1.grid(True, alpha=0.3)
-            
-            # Gráfico de cambio
-            change_value = merval_data.get('change_value', 0)
-            color = 'green' if change_value > 0 else 'red' if change_value < 0 else 'gray'
-            
-            ax2.bar(['Cambio %'], [change_value], color=color, alpha=0.7)
-            ax2.set_title('MERVAL - Cambio Porcentual', fontsize=14, fontweight='bold')
-            ax2.set_ylabel('Cambio (%)')
-            ax2.grid(True, alpha=0.3)
-            ax2.axhline(y=0, color='black', linestyle='-', alpha=0.3)
-            
-            plt.tight_layout()
+            # Sin precio el gráfico no aporta nada: no se llega a crear la figura
+            if not price_value:
+                return None
             
-            # Convertir a base64
-            chart_data = await self._chart_to_base64(fig)
-            plt.close(fig)
+            # Dibujar fuera del event loop
+            chart_image = await asyncio.to_thread(self._draw_merval_chart, merval_data, price_value, f"{stamp}_merval.svg")
             
             return {
                 'type': 'merval_analysis',
                 'title': 'Análisis del Índice MERVAL',
-                'data': chart_data,
-                'description': 'Análisis del comportamiento del índice principal de la bolsa argentina'
+                'description': 'Análisis del comportamiento del índice principal de la bolsa argentina',
+                **chart_image
             }
             
         except Exception as e:
             print(f"Error creando gráfico MERVAL: {e}")
             return None
     
-    async def _create_stocks_chart(self, stocks_data: Dict) -> Optional[Dict]:
+    def _draw_merval_chart(self, merval_data: Dict, price_value: float, filename: str) -> Dict:
+        """Dibuja el gráfico del MERVAL (bloqueante, pensado para asyncio.to_thread)"""
+        # Figure propia del hilo en lugar de pyplot: el estado global de pyplot no es seguro entre hilos
+        fig = _chart_figure((15, 6))
+        ax1, ax2 = fig.subplots(1, 2)
+        
+        # Gráfico de precio
+        ax1.bar(['MERVAL'], [price_value], color='blue', alpha=0.7)
+        ax1.set_title('Índice MERVAL - Precio Actual', fontsize=14, fontweight='bold')
+        ax1.set_ylabel('Precio')
+        ax1.grid(True, alpha=0.3)
+        
+        # Gráfico de cambio
+        change_value = merval_data.get('change_value', 0)
+        color = 'green' if change_value > 0 else 'red' if change_value < 0 else 'gray'
+        
+        ax2.bar(['Cambio %'], [change_value], color=color, alpha=0.7)
+        ax2.set_title('MERVAL - Cambio Porcentual', fontsize=14, fontweight='bold')
+        ax2.set_ylabel('Cambio (%)')
+        ax2.grid(True, alpha=0.3)
+        ax2.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+        
+        return self._export_chart(fig, filename)
+    
+    async def _create_stocks_chart(self, stocks_data: Dict, stamp: str) -> Optional[Dict]:
         """Crea gráfico del análisis de acciones"""
         try:
             if not stocks_data or stocks_data.get('status') == 'no_data':
@@ -171,321 +394,241 @@ class PresentationAgent:
             if not stocks:
                 return None
             
-            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 10))
-            
-            # Gráfico de precios de acciones
-            symbols = [stock['symbol'] for stock in stocks]
-            prices = []
-            for stock in stocks:
-                try:
-                    price_str = stock['price'].replace(',', '').replace('.', '')
-                    prices.append(float(price_str))
-                except:
-                    prices.append(0)
-            
-            bars1 = ax1.bar(symbols, prices, color='skyblue', alpha=0.7)
-            ax1.set_title('Precios de Acciones Argentinas', fontsize=14, fontweight='bold')
-            ax1.set_ylabel('Precio')
-            ax1.grid(True, alpha=0.3)
-            
-            # Agregar valores en las barras
-            for bar, price in zip(bars1, prices):
-                height = bar.get_height()
-                ax1.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{price:.2f}', ha='center', va='bottom')
-            
-            # Gráfico de cambios porcentuales
-            changes = [stock['change_value'] for stock in stocks]
-            colors = ['green' if c > 0 else 'red' if c < 0 else 'gray' for c in changes]
-            
-            bars2 = ax2.bar(symbols, changes, color=colors, alpha=0.7)
-            ax2.set_title('Cambios Porcentuales de Acciones', fontsize=14, fontweight='bold')
-            ax2.set_ylabel('Cambio (%)')
-            ax2.grid(True, alpha=0.3)
-            ax2.axhline(y=0, color='black', linestyle='-', alpha=0.3)
-            
-            # Agregar valores en las barras
-            for bar, change in zip(bars2, changes):
-                height = bar.get_height()
-                ax2.text(bar.get_x() + bar.get_width()/2., height,
-                        f'{change:.2f}%', ha='center', va='bottom' if height > 0 else 'top')
-            
-            plt.tight_layout()
-            
-            # Convertir a base64
-            chart_data = await self._chart_to_base64(fig)
-            plt.close(fig)
+            # Dibujar fuera del event loop
+            chart_image = await asyncio.to_thread(self._draw_stocks_chart, stocks, f"{stamp}_stocks.svg")
             
             return {
                 'type': 'stocks_analysis',
                 'title': 'Análisis de Acciones Individuales',
-                'data': chart_data,
-                'description': 'Comparación de precios y cambios de las principales acciones argentinas'
+                'description': 'Comparación de precios y cambios de las principales acciones argentinas',
+                **chart_image
             }
             
         except Exception as e:
             print(f"Error creando gráfico de acciones: {e}")
             return None
     
-    async def _create_currency_chart(self, currency_data: Dict) -> Optional[Dict]:
+    def _draw_stocks_chart(self, stocks: List[Dict], filename: str) -> Dict:
+        """Dibuja el gráfico de acciones (bloqueante, pensado para asyncio.to_thread)"""
+        fig = _chart_figure((15, 10))
+        ax1, ax2 = fig.subplots(2, 1)
+        
+        # Gráfico de precios de acciones
+        symbols = [stock['symbol'] for stock in stocks]
+        prices = np.fromiter((_parse_price(stock.get('price', '0')) for stock in stocks), dtype=np.float64, count=len(stocks))
+        changes = np.fromiter((stock['change_value'] for stock in stocks), dtype=np.float64, count=len(stocks))
+        
+        # Con muchas acciones las barras no se llegan a leer: se muestran las de mayor
+        # movimiento (en su orden original) y el resto se resume con su promedio
+        if len(stocks) > MAX_STOCK_BARS:
+            keep = np.zeros(len(stocks), dtype=bool)
+            keep[np.argsort(-np.abs(changes), kind='stable')[:MAX_STOCK_BARS - 1]] = True
+            symbols = [symbol for symbol, kept in zip(symbols, keep) if kept] + ['Otros']
+            prices = np.append(prices[keep], prices[~keep].mean())
+            changes = np.append(changes[keep], changes[~keep].mean())
+        
+        bars1 = ax1.bar(symbols, prices, color='skyblue', alpha=0.7)
+        ax1.set_title('Precios de Acciones Argentinas', fontsize=14, fontweight='bold')
+        ax1.set_ylabel('Precio')
+        ax1.grid(True, alpha=0.3)
+        
+        # Agregar valores en las barras
+        ax1.bar_label(bars1, fmt='%.2f')
+        
+        # Gráfico de cambios porcentuales
+        colors = np.where(changes > 0, 'green', np.where(changes < 0, 'red', 'gray'))
+        
+        bars2 = ax2.bar(symbols, changes, color=colors, alpha=0.7)
+        ax2.set_title('Cambios Porcentuales de Acciones', fontsize=14, fontweight='bold')
+        ax2.set_ylabel('Cambio (%)')
+        ax2.grid(True, alpha=0.3)
+        ax2.axhline(y=0, color='black', linestyle='-', alpha=0.3)
+        
+        # Agregar valores en las barras (bar_label ubica debajo las etiquetas de barras negativas)
+        ax2.bar_label(bars2, fmt='%.2f%%')
+        
+        return self._export_chart(fig, filename)
+    
+    async def _create_currency_chart(self, currency_data: Dict, stamp: str) -> Optional[Dict]:
         """Crea gráfico del análisis de divisas"""
         try:
             if not currency_data or currency_data.get('status') == 'no_data':
                 return None
             
-            fig, ax = plt.subplots(1, 1, figsize=(10, 6))
-            
-            # Gráfico del tipo de cambio USD/ARS
-            price_str = currency_data.get('price', '0').replace(',', '').replace('.', '')
-            try:
-                price_value = float(price_str)
-            except:
-                price_value = 0
-            
-            ax.bar(['USD/ARS'], [price_value], color='orange', alpha=0.7)
-            ax.set_title('Tipo de Cambio USD/ARS', fontsize=14, fontweight='bold')
-            ax.set_ylabel('Precio (ARS por USD)')
-            ax.grid(True, alpha=0.3)
+            price_value = _parse_price(currency_data.get('price', '0'))
             
-            # Agregar valor en la barra
-            ax.text(0, price_value, f'{price_value:.2f}', ha='center', va='bottom', fontsize=12)
-            
-            plt.tight_layout()
+            # Sin precio el gráfico no aporta nada: no se llega a crear la figura
+            if not price_value:
+                return None
             
-            # Convertir a base64
-            chart_data = await self._chart_to_base64(fig)
-            plt.close(fig)
+            # Dibujar fuera del event loop
+            chart_image = await asyncio.to_thread(self._draw_currency_chart, currency_data, price_value, f"{stamp}_currency.svg")
             
             return {
                 'type': 'currency_analysis',
                 'title': 'Análisis de Divisas',
-                'data': chart_data,
-                'description': 'Tipo de cambio actual USD/ARS y su impacto en el mercado'
+                'description': 'Tipo de cambio actual USD/ARS y su impacto en el mercado',
+                **chart_image
             }
             
         except Exception as e:
             print(f"Error creando gráfico de divisas: {e}")
             return None
     
-    async def _create_trends_chart(self, trends_data: Dict) -> Optional[Dict]:
+    def _draw_currency_chart(self, currency_data: Dict, price_value: float, filename: str) -> Dict:
+        """Dibuja el gráfico de divisas (bloqueante, pensado para asyncio.to_thread)"""
+        fig = _chart_figure((10, 6))
+        ax = fig.subplots()
+        
+        # Gráfico del tipo de cambio USD/ARS
+        ax.bar(['USD/ARS'], [price_value], color='orange', alpha=0.7)
+        ax.set_title('Tipo de Cambio USD/ARS', fontsize=14, fontweight='bold')
+        ax.set_ylabel('Precio (ARS por USD)')
+        ax.grid(True, alpha=0.3)
+        
+        # Agregar valor en la barra
+        ax.text(0, price_value, f'{price_value:.2f}', ha='center', va='bottom', fontsize=12)
+        
+        return self._export_chart(fig, filename)
+    
+    async def _create_trends_chart(self, trends_data: Dict, stamp: str) -> Optional[Dict]:
         """Crea gráfico de tendencias del mercado"""
         try:
-            if not trends_data or trends_data.get('status') == 'no_data':
+            # Sin datos de tendencia solo quedarían barras neutrales de relleno
+            if not trends_data or trends_data.get('status') == 'no_data' or not trends_data.get('trend_data'):
                 return None
             
-            fig, ax = plt.subplots(1, 1, figsize=(12, 6))
-            
-            # Gráfico de sentimiento del mercado
-            sentiment_data = trends_data.get('trend_data', {})
-            
-            # Crear un gráfico de indicadores
-            indicators = ['MERVAL', 'Acciones', 'Divisas']
-            values = [1, 1, 1]  # Valores neutrales por defecto
-            
-            # Colores basados en tendencias
-            colors = ['blue', 'green', 'orange']
-            
-            bars = ax.bar(indicators, values, color=colors, alpha=0.7)
-            ax.set_title('Indicadores del Mercado Argentino', fontsize=14, fontweight='bold')
-            ax.set_ylabel('Estado del Mercado')
-            ax.set_ylim(0, 2)
-            ax.grid(True, alpha=0.3)
-            
-            # Agregar etiquetas
-            for bar, indicator in zip(bars, indicators):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height,
-                        'Activo', ha='center', va='bottom', fontsize=10)
-            
-            plt.tight_layout()
-            
-            # Convertir a base64
-            chart_data = await self._chart_to_base64(fig)
-            plt.close(fig)
+            # Dibujar fuera del event loop
+            chart_image = await asyncio.to_thread(self._draw_trends_chart, trends_data, f"{stamp}_trends.svg")
             
             return {
                 'type': 'market_trends',
                 'title': 'Tendencias del Mercado',
-                'data': chart_data,
-                'description': 'Resumen de las tendencias generales del mercado financiero argentino'
+                'description': 'Resumen de las tendencias generales del mercado financiero argentino',
+                **chart_image
             }
             
         except Exception as e:
             print(f"Error creando gráfico de tendencias: {e}")
             return None
     
-    async def _chart_to_base64(self, fig) -> str:
-        """Convierte un gráfico matplotlib a base64"""
+    def _draw_trends_chart(self, trends_data: Dict, filename: str) -> Dict:
+        """Dibuja el gráfico de tendencias (bloqueante, pensado para asyncio.to_thread)"""
+        fig = _chart_figure((12, 6))
+        ax = fig.subplots()
+        
+        # Gráfico de sentimiento del mercado
+        sentiment_data = trends_data.get('trend_data', {})
+        
+        # Crear un gráfico de indicadores
+        indicators = ['MERVAL', 'Acciones', 'Divisas']
+        values = [1, 1, 1]  # Valores neutrales por defecto
+        
+        # Colores basados en tendencias
+        colors = ['blue', 'green', 'orange']
+        
+        bars = ax.bar(indicators, values, color=colors, alpha=0.7)
+        ax.set_title('Indicadores del Mercado Argentino', fontsize=14, fontweight='bold')
+        ax.set_ylabel('Estado del Mercado')
+        ax.set_ylim(0, 2)
+        ax.grid(True, alpha=0.3)
+        
+        # Agregar etiquetas
+        for bar, indicator in zip(bars, indicators):
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height,
+                    'Activo', ha='center', va='bottom', fontsize=10)
+        
+        return self._export_chart(fig, filename)
+    
+    def _export_chart(self, fig, filename: str) -> Dict:
+        """Guarda el gráfico como SVG junto a la presentación y devuelve su ruta relativa al HTML,
+        o devuelve el SVG para incrustarlo si los gráficos van incrustados"""
+        if self.embed_charts:
+            return {'svg': self._chart_to_svg(fig, f"chart_{os.path.splitext(filename)[0]}_")}
+        
+        relpath = f"{CHARTS_SUBDIR}/{filename}"
+        try:
+            # Gráficos de barras: en vectorial pesan menos que rasterizados y se ven nítidos a cualquier escala
+            fig.savefig(os.path.join(PRESENTATIONS_DIR, relpath), format='svg')
+            return {'path': relpath}
+        except Exception as e:
+            print(f"Error guardando gráfico {relpath}: {e}")
+            return {'path': ''}
+    
+    def _chart_to_svg(self, fig, id_prefix: str) -> str:
+        """Convierte un gráfico matplotlib al elemento <svg> para incrustarlo en el HTML
+        (id_prefix: prefijo de sus ids, distinto para cada gráfico de la página)"""
         try:
-            buffer = BytesIO()
-            fig.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
-            buffer.seek(0)
-            image_base64 = base64.b64encode(buffer.getvalue()).decode()
-            buffer.close()
-            return image_base64
+            with StringIO() as buffer:
+                fig.savefig(buffer, format='svg')
+                svg = buffer.getvalue()
+            # Dentro del HTML sobran la declaración XML y el DOCTYPE del archivo SVG
+            svg = svg[svg.find('<svg'):]
+            return _SVG_ID_REFS.sub(lambda m: m.group(1) + id_prefix, svg)
         except Exception as e:
-            print(f"Error convirtiendo gráfico a base64: {e}")
+            print(f"Error convirtiendo gráfico a SVG: {e}")
             return ""
     
     async def _generate_html_presentation(self, report: Dict, charts: List[Dict]) -> str:
-        """Genera una presentación HTML con los gráficos"""
+        """Genera la presentación HTML con los gráficos en memoria (para usarla fuera de un archivo)"""
         try:
-            html_template = f"""
-            <!DOCTYPE html>
-            <html lang="es">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>Análisis Financiero Argentina - {datetime.now().strftime('%d/%m/%Y')}</title>
-                <style>
-                    body {{
-                        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                        margin: 0;
-                        padding: 20px;
-                        background-color: #f5f5f5;
-                    }}
-                    .container {{
-                        max-width: 1200px;
-                        margin: 0 auto;
-                        background-color: white;
-                        padding: 30px;
-                        border-radius: 10px;
-                        box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-                    }}
-                    .header {{
-                        text-align: center;
-                        margin-bottom: 40px;
-                        border-bottom: 3px solid #2c3e50;
-                        padding-bottom: 20px;
-                    }}
-                    .header h1 {{
-                        color: #2c3e50;
-                        margin: 0;
-                        font-size: 2.5em;
-                    }}
-                    .header p {{
-                        color: #7f8c8d;
-                        margin: 10px 0 0 0;
-                        font-size: 1.2em;
-                    }}
-                    .chart-section {{
-                        margin: 30px 0;
-                        padding: 20px;
-                        border: 1px solid #ecf0f1;
-                        border-radius: 8px;
-                        background-color: #fafafa;
-                    }}
-                    .chart-title {{
-                        color: #2c3e50;
-                        font-size: 1.5em;
-                        margin-bottom: 15px;
-                        font-weight: bold;
-                    }}
-                    .chart-description {{
-                        color: #7f8c8d;
-                        margin-bottom: 20px;
-                        font-style: italic;
-                    }}
-                    .chart-image {{
-                        text-align: center;
-                        margin: 20px 0;
-                    }}
-                    .chart-image img {{
-                        max-width: 100%;
-                        height: auto;
-                        border-radius: 5px;
-                        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                    }}
-                    .summary {{
-                        background-color: #ecf0f1;
-                        padding: 20px;
-                        border-radius: 8px;
-                        margin-top: 30px;
-                    }}
-                    .summary h3 {{
-                        color: #2c3e50;
-                        margin-top: 0;
-                    }}
-                    .insights {{
-                        background-color: #e8f5e8;
-                        padding: 20px;
-                        border-radius: 8px;
-                        margin-top: 20px;
-                        border-left: 4px solid #27ae60;
-                    }}
-                    .insights h3 {{
-                        color: #27ae60;
-                        margin-top: 0;
-                    }}
-                    .footer {{
-                        text-align: center;
-                        margin-top: 40px;
-                        padding-top: 20px;
-                        border-top: 1px solid #ecf0f1;
-                        color: #7f8c8d;
-                    }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>📊 Análisis Financiero Argentina</h1>
-                        <p>Reporte del {datetime.now().strftime('%d de %B de %Y')}</p>
-                    </div>
-                    
-                    {self._generate_chart_sections(charts)}
-                    
-                    <div class="summary">
-                        <h3>📝 Resumen Ejecutivo</h3>
-                        <p>{report.get('summary', 'No hay resumen disponible.')}</p>
-                    </div>
-                    
-                    <div class="insights">
-                        <h3>💡 Insights Adicionales</h3>
-                        <p>{report.get('insights', 'No hay insights adicionales disponibles.')}</p>
-                    </div>
-                    
-                    <div class="footer">
-                        <p>Generado automáticamente por el Sistema Multiagente de Análisis Financiero</p>
-                        <p>Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
-            return html_template
+            with StringIO() as buffer:
+                self._write_html_presentation(report, charts, buffer, datetime.now())
+                return buffer.getvalue()
             
         except Exception as e:
             print(f"Error generando HTML: {e}")
             return ""
     
-    def _generate_chart_sections(self, charts: List[Dict]) -> str:
-        """Genera las secciones HTML para cada gráfico"""
-        sections = []
+    def _write_html_presentation(self, report: Dict, charts: List[Dict], fp, now: datetime) -> None:
+        """Escribe la presentación HTML en fp sección por sección, sin armar el documento entero en memoria"""
+        if self.embed_charts:
+            style = f"<style>{_CSS}</style>"
+        else:
+            style = f'<link rel="stylesheet" href="{STYLESHEET}">'
+        
+        fp.write(_HTML_HEAD.substitute(
+            style=style,
+            title_date=now.strftime('%d/%m/%Y'),
+            header_date=now.strftime('%d de %B de %Y')
+        ))
         
         for chart in charts:
-            section = f"""
+            fp.write(self._chart_section(chart))
+        
+        fp.write(_HTML_FOOT.substitute(
+            summary=report.get('summary', 'No hay resumen disponible.'),
+            insights=report.get('insights', 'No hay insights adicionales disponibles.'),
+            generated_at=now.strftime('%Y-%m-%d %H:%M:%S')
+        ))
+    
+    def _chart_section(self, chart: Dict) -> str:
+        """Genera la sección HTML de un gráfico"""
+        # Los gráficos guardados como archivo se referencian por ruta; los incrustados van en línea
+        if 'svg' in chart:
+            image = chart['svg']
+        else:
+            image = f"""<img src="{chart.get('path', '')}" alt="{chart.get('title', 'Gráfico')}">"""
+        return f"""
             <div class="chart-section">
                 <div class="chart-title">{chart.get('title', 'Gráfico')}</div>
                 <div class="chart-description">{chart.get('description', '')}</div>
                 <div class="chart-image">
-                    <img src="data:image/png;base64,{chart.get('data', '')}" alt="{chart.get('title', 'Gráfico')}">
+                    {image}
                 </div>
             </div>
             """
-            sections.append(section)
-        
-        return ''.join(sections)
     
     async def _generate_presentation_insights(self, report: Dict) -> str:
         """Genera insights adicionales para la presentación"""
         try:
+            # JSON compacto: la indentación no le aporta nada al modelo y solo alarga el prompt
             insights_prompt = f"""
             Basándote en el siguiente análisis financiero argentino, genera insights adicionales para una presentación:
             
             Datos del reporte:
-            {json.dumps(report, indent=2, ensure_ascii=False)}
+            {orjson.dumps(report, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')}
             
             Proporciona:
             1. Puntos clave para destacar en la presentación
@@ -505,15 +648,23 @@ class PresentationAgent:
     
     async def save_presentation(self, presentation: Dict, filename: str = None) -> str:
         """Guarda la presentación en un archivo HTML"""
+        # Mismo instante que los SVG de los gráficos
+        timestamp = presentation.get('timestamp')
+        run_ts = datetime.fromisoformat(timestamp) if timestamp else datetime.now()
         if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"financial_presentation_{timestamp}.html"
+            filename = f"financial_presentation_{run_ts.strftime('%Y%m%d_%H%M%S')}.html"
         
-        filepath = os.path.join("Agentes_Inteligentes/MultiAgent/presentations", filename)
+        filepath = os.path.join(PRESENTATIONS_DIR, filename)
         
         try:
+            if not self.embed_charts:
+                _ensure_stylesheet()
+            
+            # Las secciones se escriben a medida que se generan, sin armar el HTML completo en memoria
             with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(presentation.get('html_content', ''))
+                self._write_html_presentation(
+                    presentation.get('report_data', {}), presentation.get('charts', []), f, run_ts
+                )
             
             print(f"Presentación guardada en: {filepath}")
             return filepath
@@ -557,13 +708,18 @@ async def main():
         print("❌ No se encontró el directorio de reportes")
         return
     
-    report_files = [f for f in os.listdir(reports_dir) if f.startswith('financial_report_') and f.endswith('.json')]
-    if not report_files:
+    # Usar el archivo más reciente (el nombre lleva el timestamp, basta con el máximo)
+    latest_file = None
+    with os.scandir(reports_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith('financial_report_') and name.endswith('.json') and (latest_file is None or name > latest_file):
+                latest_file = name
+    
+    if latest_file is None:
         print("❌ No se encontraron archivos de reporte")
         return
     
-    # Usar el archivo más reciente
-    latest_file = sorted(report_files)[-1]
     report_file_path = os.path.join(reports_dir, latest_file)
     
     # Crear y ejecutar el agente
@@ -3,6 +3,7 @@
 Configuración del Sistema Multiagente de Análisis Financiero
 """
 
+import functools
 import os
 from dotenv import load_dotenv
 
@@ -37,8 +38,13 @@ class Config:
     # Acciones argentinas principales
     ARGENTINE_STOCKS = ['GGAL', 'PAMP', 'TXAR', 'YPFD', 'MIRG', 'BBAR', 'CRES', 'EDN', 'HARG', 'LOMA']
     
-    # Configuración de gráficos
+    # URLs de Yahoo Finance de las acciones principales, armadas una sola vez
+    # (una comprensión en el cuerpo de la clase no ve DATA_SOURCES, por eso map)
+    STOCK_URLS = dict(zip(ARGENTINE_STOCKS, map(f"{DATA_SOURCES['yahoo_base']}{{}}.BA".format, ARGENTINE_STOCKS)))
+    
+    # Configuración de gráficos (los agentes dibujan sin interfaz gráfica, con el backend Agg)
     CHART_CONFIG = {
+        'backend': 'Agg',
         'figure_size': (15, 10),
         'dpi': 300,
         'style': 'seaborn-v0_8',
@@ -53,8 +59,9 @@ class Config:
     }
     
     @classmethod
+    @functools.cache
     def validate_config(cls):
-        """Valida que la configuración esté completa"""
+        """Valida que la configuración esté completa (se valida una sola vez por proceso)"""
         errors = []
         
         if not cls.GOOGLE_API_KEY:
@@ -66,18 +73,18 @@ class Config:
             ('REPORTS_DIR', cls.REPORTS_DIR),
             ('PRESENTATIONS_DIR', cls.PRESENTATIONS_DIR)
         ]:
-            if not os.path.exists(dir_path):
-                try:
-                    os.makedirs(dir_path, exist_ok=True)
-                except Exception as e:
-                    errors.append(f"No se pudo crear {dir_name}: {e}")
+            try:
+                os.makedirs(dir_path, exist_ok=True)
+            except Exception as e:
+                errors.append(f"No se pudo crear {dir_name}: {e}")
         
-        return errors
+        # Tupla: el resultado queda en caché y se comparte entre llamadas
+        return tuple(errors)
     
     @classmethod
     def get_stock_url(cls, symbol: str) -> str:
         """Obtiene la URL de Yahoo Finance para una acción argentina"""
-        return f"{cls.DATA_SOURCES['yahoo_base']}{symbol}.BA"
+        return cls.STOCK_URLS.get(symbol) or f"{cls.DATA_SOURCES['yahoo_base']}{symbol}.BA"
     
     @classmethod
     def get_model_info(cls):
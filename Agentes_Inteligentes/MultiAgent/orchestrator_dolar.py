@@ -4,54 +4,196 @@ Orquestador Principal con DolarAPI Collector como primer agente
 """
 
 import asyncio
+import collections
+import contextlib
+import functools
+import hashlib
+import logging
 import os
+import re
 import sys
+import tempfile
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
-import json
 
-# Agregar el directorio de agentes al path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'agents'))
+import orjson
 
-from dolar_api_collector import DolarAPICollector
-from dolar_analyst_agent import DolarAnalystAgent
-from pdf_generator_agent import PDFGeneratorAgent
+# Agregar el directorio de agentes al path, una sola vez: cada entrada repetida
+# se vuelve a recorrer en cada import que no se resuelve antes
+agents_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'agents')
+if agents_path not in sys.path:
+    sys.path.append(agents_path)
+
+from base_analyst_agent import close_model_clients
+
+# Los módulos de los agentes se importan recién al crear cada agente (ver _shared_agent):
+# el generador de PDF arrastra matplotlib y reportlab, que no hacen falta si la recolección falla
+
+# El progreso del orquestador va a logging: ver log_to_stdout para mostrarlo en consola
+logger = logging.getLogger(__name__)
+
+# Separador de los encabezados de cada paso
+SEPARATOR = "=" * 60
+
+# Agentes del sistema, en el orden en que intervienen
+AGENT_NAMES = ('dolar_collector', 'dolar_analyst', 'pdf_generator')
+
+# Verificación previa a la ejecución: formato de las API keys de Google y endpoint de DolarAPI
+API_KEY_PATTERN = re.compile(r'AI[\w-]{30,}')
+DOLARAPI_URL = "https://dolarapi.com/v1/dolares"
+PREFLIGHT_TIMEOUT = 2
+
+# Pasos que conserva el log de ejecución; get_system_status muestra solo los últimos
+EXECUTION_LOG_SIZE = 5
+
+
+@contextlib.contextmanager
+def log_to_stdout():
+    """Muestra en stdout los mensajes del orquestador mientras dura el bloque
+    
+    Se escriben en el momento, desde el mismo hilo: así quedan intercalados en orden
+    con lo que los agentes imprimen con print.
+    """
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter('%(message)s'))
+    
+    previous_level, previous_propagate = logger.level, logger.propagate
+    logger.addHandler(stream_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    try:
+        yield
+    finally:
+        logger.removeHandler(stream_handler)
+        logger.setLevel(previous_level)
+        logger.propagate = previous_propagate
+
+
+@functools.cache
+def _ensure_dir(path: str) -> None:
+    """Crea un directorio si falta; cada ruta se verifica una sola vez por proceso"""
+    os.makedirs(path, exist_ok=True)
+
+
+def _data_key(dolar_data: List[Dict]) -> str:
+    """Hash del contenido de las cotizaciones, independiente del orden de las claves"""
+    payload = orjson.dumps(dolar_data, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+# Caché de resultados en disco: para unas cotizaciones ya analizadas se reutilizan el reporte y el PDF
+RESULT_CACHE_DIR = os.path.join("data", ".cache")
+
+
+def _result_cache_path(key: str) -> str:
+    """Ruta del resultado guardado para una clave de cotizaciones"""
+    return os.path.join(RESULT_CACHE_DIR, f"{key}.result.json")
+
+
+def _result_cache_get(key: str) -> Optional[Dict]:
+    """Devuelve el resultado guardado para unas cotizaciones si sus archivos todavía existen"""
+    try:
+        with open(_result_cache_path(key), 'rb') as f:
+            entry = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    
+    if all(entry.get(name) and os.path.exists(entry[name]) for name in ('report_file', 'pdf_file')):
+        return entry
+    return None
+
+
+def _result_cache_set(key: str, report_file: str, pdf_file: str) -> None:
+    """Guarda el resultado de un análisis; se escribe a un temporal y se reemplaza de forma atómica"""
+    try:
+        _ensure_dir(RESULT_CACHE_DIR)
+        entry = {'report_file': report_file, 'pdf_file': pdf_file, 'timestamp': datetime.now().isoformat()}
+        with tempfile.NamedTemporaryFile('wb', dir=RESULT_CACHE_DIR, suffix='.tmp', delete=False) as f:
+            f.write(orjson.dumps(entry))
+        os.replace(f.name, _result_cache_path(key))
+    except OSError as e:
+        logger.warning("No se pudo guardar el resultado en la caché: %s", e)
+
+
+@functools.lru_cache(maxsize=4 * len(AGENT_NAMES))
+def _shared_agent(name: str, api_key: str, verbose: bool = False):
+    """Crea un agente recién cuando se usa, una sola vez por API key; los orquestadores siguientes lo reutilizan
+
+    Los agentes pueden compartirse entre distintos event loops porque no guardan recursos
+    atados a un loop: el cliente de Gemini se resuelve por loop en cada uso (get_model_client)
+    y se cierra al final de execute_full_analysis.
+    verbose: solo lo usa el recolector (mostrar la tabla de cotizaciones)
+    """
+    if name == 'dolar_collector':
+        from dolar_api_collector import DolarAPICollector
+        return DolarAPICollector(verbose=verbose)
+    if name == 'dolar_analyst':
+        from dolar_analyst_agent import DolarAnalystAgent
+        return DolarAnalystAgent(api_key)
+    if name == 'pdf_generator':
+        from pdf_generator_agent import PDFGeneratorAgent
+        return PDFGeneratorAgent(api_key)
+    raise ValueError(f"Agente desconocido: {name}")
+
+
+def _write_json_sync(filepath: str, data) -> None:
+    """Escribe datos como JSON indentado en UTF-8 (bloqueante, pensado para asyncio.to_thread)"""
+    with open(filepath, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+
+
+def _analyst_input(dolar_data: List[Dict]) -> Dict:
+    """Arma la estructura de datos que recibe el analista, SOLO con datos reales de DolarAPI"""
+    return {
+        'currency': {
+            'pair': 'USD/ARS',
+            # Usar precio de venta del oficial; se guarda como número, tal como llega de DolarAPI
+            'price': dolar_data[0].get('venta', 1450),
+            'timestamp': datetime.now().isoformat(),
+            'source': 'dolar_api'
+        },
+        'dolar_data': dolar_data,  # Incluir todos los datos de DolarAPI
+        'data_type': 'dolar_cotizations_only',
+        'note': 'Este analisis se basa unicamente en datos de cotizaciones del dolar de DolarAPI'
+    }
 
 
 class MultiAgentOrchestratorDolar:
     """Orquestador principal que coordina todos los agentes del sistema con DolarAPI"""
     
-    def __init__(self, api_key: str):
-        """Inicializa el orquestador con la API key"""
+    def __init__(self, api_key: str, debug_dump: bool = False, verbose: bool = True):
+        """Inicializa el orquestador con la API key
+        
+        debug_dump: guardar también en data/ los datos que recibe el analista
+        verbose: mostrar en consola la tabla de cotizaciones obtenidas
+        """
         self.api_key = api_key
+        self.debug_dump = debug_dump
+        self.verbose = verbose
         self.agents = {}
-        self.execution_log = []
-        
-        # Inicializar agentes
-        self._initialize_agents()
+        self.execution_log = collections.deque(maxlen=EXECUTION_LOG_SIZE)
     
-    def _initialize_agents(self):
-        """Inicializa todos los agentes del sistema"""
-        try:
-            print("Inicializando agentes...")
-            
-            self.agents['dolar_collector'] = DolarAPICollector()
-            self.agents['dolar_analyst'] = DolarAnalystAgent(self.api_key)
-            self.agents['pdf_generator'] = PDFGeneratorAgent(self.api_key)
-            
-            print("Todos los agentes inicializados correctamente")
-            
-        except Exception as e:
-            print(f"Error inicializando agentes: {e}")
-            raise
+    def _agent(self, name: str):
+        """Devuelve el agente pedido, creándolo en el primer uso"""
+        agent = self.agents.get(name)
+        if agent is None:
+            # El registro es propio de cada orquestador; las instancias se comparten.
+            # La verbosidad solo distingue al recolector: los demás agentes sirven en ambos modos
+            verbose = self.verbose and name == 'dolar_collector'
+            agent = self.agents[name] = _shared_agent(name, self.api_key, verbose)
+        return agent
     
     async def execute_full_analysis(self) -> Dict:
         """Ejecuta el análisis completo del mercado financiero argentino con datos de DolarAPI"""
         start_time = datetime.now()
-        print(f"Iniciando analisis completo del mercado argentino con DolarAPI - {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info("Iniciando analisis completo del mercado argentino con DolarAPI - %s", start_time.strftime('%Y-%m-%d %H:%M:%S'))
         
+        # Todas las claves del resultado desde el inicio; end_time queda en None si la ejecución corta antes
         results = {
             'start_time': start_time.isoformat(),
+            'end_time': None,
+            'execution_time_seconds': 0.0,
             'status': 'running',
             'steps': {},
             'errors': []
@@ -59,18 +201,18 @@ class MultiAgentOrchestratorDolar:
         
         try:
             # Paso 1: DolarAPI Collector
-            print("\n" + "="*60)
-            print("PASO 1: RECOLECCION DE DATOS DE DOLARAPI")
-            print("="*60)
+            logger.info("\n%s\nPASO 1: RECOLECCION DE DATOS DE DOLARAPI\n%s", SEPARATOR, SEPARATOR)
             
             dolar_data = await self._execute_dolar_collector()
             if dolar_data:
+                # Un mismo instante para el resultado del paso y su entrada en el log
+                ts = datetime.now().isoformat()
                 results['steps']['dolar_collection'] = {
                     'status': 'success',
                     'output_data': dolar_data,
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': ts
                 }
-                self._log_step('dolar_collection', 'success', f'Datos obtenidos: {len(dolar_data)} cotizaciones')
+                self._log_step('dolar_collection', 'success', f'Datos obtenidos: {len(dolar_data)} cotizaciones', ts)
             else:
                 results['steps']['dolar_collection'] = {
                     'status': 'failed',
@@ -80,48 +222,69 @@ class MultiAgentOrchestratorDolar:
                 self._log_step('dolar_collection', 'failed', 'No se obtuvieron datos de DolarAPI')
                 return results
             
-            # Paso 2: Análisis de Datos de DolarAPI
-            print("\n" + "="*60)
-            print("PASO 2: ANALISIS DE DATOS DE DOLARAPI")
-            print("="*60)
-            
-            report_file = await self._execute_dolar_analysis(dolar_data)
-            if report_file:
-                results['steps']['dolar_analysis'] = {
-                    'status': 'success',
-                    'output_file': report_file,
-                    'timestamp': datetime.now().isoformat()
-                }
-                self._log_step('dolar_analysis', 'success', report_file)
+            # Si un análisis anterior ya procesó estas mismas cotizaciones, se reutilizan su reporte y su PDF
+            data_key = _data_key(dolar_data)
+            cached = await asyncio.to_thread(_result_cache_get, data_key)
+            if cached:
+                logger.info("Cotizaciones sin cambios desde un analisis anterior: se reutilizan sus archivos")
+                ts = datetime.now().isoformat()
+                for step, name in (('dolar_analysis', 'report_file'), ('pdf_generation', 'pdf_file')):
+                    results['steps'][step] = {
+                        'status': 'success',
+                        'output_file': cached[name],
+                        'timestamp': cached['timestamp'],
+                        'cached': True
+                    }
+                    self._log_step(step, 'success', f"{cached[name]} (en cache)", ts)
             else:
-                results['steps']['dolar_analysis'] = {
-                    'status': 'failed',
-                    'error': 'No se pudo completar el analisis de datos de DolarAPI'
-                }
-                results['errors'].append('Analisis de DolarAPI fallo')
-                self._log_step('dolar_analysis', 'failed', 'Analisis incompleto')
-                return results
-            
-            # Paso 3: Generación de PDF con Gráficos
-            print("\n" + "="*60)
-            print("PASO 3: GENERACION DE PDF CON GRAFICOS")
-            print("="*60)
-            
-            pdf_file = await self._execute_pdf_generation(report_file)
-            if pdf_file:
-                results['steps']['pdf_generation'] = {
-                    'status': 'success',
-                    'output_file': pdf_file,
-                    'timestamp': datetime.now().isoformat()
-                }
-                self._log_step('pdf_generation', 'success', pdf_file)
-            else:
-                results['steps']['pdf_generation'] = {
-                    'status': 'failed',
-                    'error': 'No se pudo generar el PDF'
-                }
-                results['errors'].append('Generacion de PDF fallo')
-                self._log_step('pdf_generation', 'failed', 'PDF no generado')
+                # Solo para depuración: el archivo con los datos del analista se escribe mientras avanza el orquestador
+                temp_data_task = asyncio.create_task(self._create_temp_data_file(dolar_data, data_key)) if self.debug_dump else None
+                
+                # Los gráficos que solo usan las cotizaciones se dibujan mientras el analista consulta a Gemini
+                charts_task = asyncio.create_task(self._prerender_charts(dolar_data))
+                
+                # Paso 2: Análisis de Datos de DolarAPI
+                logger.info("\n%s\nPASO 2: ANALISIS DE DATOS DE DOLARAPI\n%s", SEPARATOR, SEPARATOR)
+                
+                report_file = await self._execute_dolar_analysis(dolar_data, temp_data_task)
+                if report_file:
+                    ts = datetime.now().isoformat()
+                    results['steps']['dolar_analysis'] = {
+                        'status': 'success',
+                        'output_file': report_file,
+                        'timestamp': ts
+                    }
+                    self._log_step('dolar_analysis', 'success', report_file, ts)
+                else:
+                    results['steps']['dolar_analysis'] = {
+                        'status': 'failed',
+                        'error': 'No se pudo completar el analisis de datos de DolarAPI'
+                    }
+                    results['errors'].append('Analisis de DolarAPI fallo')
+                    self._log_step('dolar_analysis', 'failed', 'Analisis incompleto')
+                    charts_task.cancel()
+                    return results
+                
+                # Paso 3: Generación de PDF con Gráficos
+                logger.info("\n%s\nPASO 3: GENERACION DE PDF CON GRAFICOS\n%s", SEPARATOR, SEPARATOR)
+                
+                pdf_file = await self._execute_pdf_generation(report_file, charts_task)
+                if pdf_file:
+                    ts = datetime.now().isoformat()
+                    results['steps']['pdf_generation'] = {
+                        'status': 'success',
+                        'output_file': pdf_file,
+                        'timestamp': ts
+                    }
+                    self._log_step('pdf_generation', 'success', pdf_file, ts)
+                    await asyncio.to_thread(_result_cache_set, data_key, report_file, pdf_file)
+                else:
+                    results['steps']['pdf_generation'] = {
+                        'status': 'failed',
+                        'error': 'No se pudo generar el PDF'
+                    }
+                    results['errors'].append('Generacion de PDF fallo')
+                    self._log_step('pdf_generation', 'failed', 'PDF no generado')
             
             # Finalizar
             end_time = datetime.now()
@@ -129,171 +292,219 @@ class MultiAgentOrchestratorDolar:
             
             results['end_time'] = end_time.isoformat()
             results['execution_time_seconds'] = execution_time
-            results['status'] = 'completed' if not results['errors'] else 'completed_with_errors'
+            if results['errors']:
+                results['status'] = 'completed_with_errors'
+            else:
+                results['status'] = 'completed_cached' if cached else 'completed'
             
-            print("\n" + "="*60)
-            print("ANALISIS COMPLETADO")
-            print("="*60)
-            print(f"Tiempo total de ejecucion: {execution_time:.2f} segundos")
-            print(f"Archivos generados:")
+            logger.info("\n%s\nANALISIS COMPLETADO\n%s", SEPARATOR, SEPARATOR)
+            logger.info("Tiempo total de ejecucion: %.2f segundos", execution_time)
+            logger.info("Archivos generados:")
             for step, data in results['steps'].items():
                 if data['status'] == 'success':
                     if step == 'dolar_collection':
-                        print(f"   - {step}: {data['output_data']} cotizaciones")
+                        logger.info("   - %s: %s cotizaciones", step, data['output_data'])
                     else:
-                        print(f"   - {step}: {data['output_file']}")
+                        logger.info("   - %s: %s", step, data['output_file'])
             
             if results['errors']:
-                print(f"Errores encontrados: {len(results['errors'])}")
+                logger.warning("Errores encontrados: %s", len(results['errors']))
                 for error in results['errors']:
-                    print(f"   - {error}")
+                    logger.warning("   - %s", error)
             
             return results
             
         except Exception as e:
-            print(f"Error critico en el orquestador: {e}")
+            logger.error("Error critico en el orquestador: %s", e)
             results['status'] = 'failed'
             results['errors'].append(f'Error critico: {str(e)}')
             results['end_time'] = datetime.now().isoformat()
             return results
+        
+        finally:
+            # Los clientes de Gemini quedan atados a este event loop: cerrar sus conexiones antes de que termine
+            await close_model_clients()
     
     async def _execute_dolar_collector(self) -> Optional[List[Dict]]:
         """Ejecuta el agente recolector de DolarAPI"""
         try:
-            print("Ejecutando DolarAPI Collector...")
-            collector = self.agents['dolar_collector']
+            logger.info("Ejecutando DolarAPI Collector...")
+            collector = self._agent('dolar_collector')
             
-            # Obtener datos
-            data = collector.get_dolar_data()
+            # Obtener datos (la consulta HTTP es bloqueante: se hace fuera del event loop)
+            data = await asyncio.to_thread(collector.get_dolar_data)
             
-            if data:
-                # Guardar en CSV y JSON
-                csv_success = collector.save_to_csv(data)
-                json_success = collector.save_to_json(data)
-                
-                # Mostrar datos
-                collector.display_data(data)
+            if data and collector.not_modified:
+                # Los datos no cambiaron desde la consulta anterior: ya están guardados
+                logger.info("DolarAPI Collector sin cambios: %s cotizaciones", len(data))
+                return data
+            elif data:
+                # Guardar en CSV y JSON en paralelo; mostrar los datos solo con el recolector en modo verbose
+                tasks = [
+                    asyncio.to_thread(collector.save_to_csv, data),
+                    asyncio.to_thread(collector.save_to_json, data)
+                ]
+                if collector.verbose:
+                    tasks.append(asyncio.to_thread(collector.display_data, data))
+                csv_success, json_success = (await asyncio.gather(*tasks))[:2]
                 
                 if csv_success and json_success:
-                    print(f"DolarAPI Collector completado: {len(data)} cotizaciones")
+                    logger.info("DolarAPI Collector completado: %s cotizaciones", len(data))
                     return data
                 else:
-                    print("DolarAPI Collector completado con errores en guardado")
+                    logger.warning("DolarAPI Collector completado con errores en guardado")
                     return data
             else:
-                print("DolarAPI Collector fallo")
+                logger.warning("DolarAPI Collector fallo")
                 return None
                 
         except Exception as e:
-            print(f"Error en DolarAPI Collector: {e}")
+            logger.error("Error en DolarAPI Collector: %s", e)
             return None
     
-    async def _execute_dolar_analysis(self, dolar_data: List[Dict]) -> Optional[str]:
-        """Ejecuta el agente analista de DolarAPI"""
+    async def _execute_dolar_analysis(self, dolar_data: List[Dict], temp_data_task: Optional[asyncio.Task] = None) -> Optional[str]:
+        """Ejecuta el agente analista de DolarAPI (temp_data_task: volcado de depuración ya iniciado)"""
         try:
-            print("Ejecutando Dolar Analyst Agent...")
-            analyst = self.agents['dolar_analyst']
+            logger.info("Ejecutando Dolar Analyst Agent...")
+            analyst = self._agent('dolar_analyst')
             
-            # Crear un archivo temporal con los datos de DolarAPI
-            temp_data_file = await self._create_temp_data_file(dolar_data)
+            # Los datos se pasan en memoria: sin escribir ni volver a leer un archivo intermedio
+            result = await analyst.run_from_dict(_analyst_input(dolar_data))
             
-            if temp_data_file:
-                result = await analyst.run(temp_data_file)
-                
-                # Limpiar archivo temporal
-                try:
-                    os.remove(temp_data_file)
-                except:
-                    pass
-                
-                if result:
-                    print(f"Dolar Analyst completado: {result}")
-                    return result
-                else:
-                    print("Dolar Analyst fallo")
-                    return None
+            if temp_data_task is not None:
+                await temp_data_task
+            
+            if result:
+                logger.info("Dolar Analyst completado: %s", result)
+                return result
             else:
-                print("No se pudo crear archivo temporal de datos")
+                logger.warning("Dolar Analyst fallo")
                 return None
                 
         except Exception as e:
-            print(f"Error en Dolar Analyst: {e}")
+            logger.error("Error en Dolar Analyst: %s", e)
             return None
     
-    async def _create_temp_data_file(self, dolar_data: List[Dict]) -> Optional[str]:
-        """Crea un archivo temporal con los datos de DolarAPI para el analista"""
+    async def _create_temp_data_file(self, dolar_data: List[Dict], data_key: Optional[str] = None) -> Optional[str]:
+        """Guarda en data/ los datos que recibe el analista, para depuración (data_key: hash ya calculado de los datos)"""
         try:
             # Asegurar que el directorio data existe
             data_dir = "data"
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir, exist_ok=True)
+            _ensure_dir(data_dir)
             
-            # Crear estructura de datos SOLO con datos reales de DolarAPI
-            formatted_data = {
-                'currency': {
-                    'pair': 'USD/ARS',
-                    'price': str(dolar_data[0].get('venta', 1450)),  # Usar precio de venta del oficial
-                    'timestamp': datetime.now().isoformat(),
-                    'source': 'dolar_api'
-                },
-                'dolar_data': dolar_data,  # Incluir todos los datos de DolarAPI
-                'data_type': 'dolar_cotizations_only',
-                'note': 'Este analisis se basa unicamente en datos de cotizaciones del dolar de DolarAPI'
-            }
+            # El archivo se nombra por el contenido: con las mismas cotizaciones ya está escrito
+            temp_filepath = os.path.join(data_dir, f"dolar_input_{data_key or _data_key(dolar_data)}.json")
+            if os.path.exists(temp_filepath):
+                return temp_filepath
             
             # Guardar archivo temporal
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            temp_filename = f"dolar_data_{timestamp}.json"
-            temp_filepath = os.path.join(data_dir, temp_filename)
-            
-            with open(temp_filepath, 'w', encoding='utf-8') as f:
-                json.dump(formatted_data, f, indent=2, ensure_ascii=False)
+            await asyncio.to_thread(_write_json_sync, temp_filepath, _analyst_input(dolar_data))
             
             return temp_filepath
             
         except Exception as e:
-            print(f"Error creando archivo temporal: {e}")
+            logger.error("Error creando archivo temporal: %s", e)
+            return None
+    
+    async def _prerender_charts(self, dolar_data: List[Dict]) -> Optional[Dict[str, Dict]]:
+        """Adelanta los gráficos del PDF que solo usan las cotizaciones; None si no se pudo"""
+        try:
+            return await self._agent('pdf_generator').prerender_charts(dolar_data)
+        except Exception as e:
+            # El paso 3 vuelve a intentarlo y dibuja todos los gráficos
+            logger.error("Error preparando gráficos del PDF: %s", e)
             return None
     
-    async def _execute_pdf_generation(self, report_file: str) -> Optional[str]:
-        """Ejecuta el agente de generación de PDF"""
+    async def _execute_pdf_generation(self, report_file: str, charts_task: Optional[asyncio.Task] = None) -> Optional[str]:
+        """Ejecuta el agente de generación de PDF (charts_task: gráficos de cotizaciones ya en preparación)"""
         try:
-            print("Ejecutando PDF Generator Agent...")
-            pdf_agent = self.agents['pdf_generator']
-            result = await pdf_agent.run(report_file)
+            logger.info("Ejecutando PDF Generator Agent...")
+            pdf_agent = self._agent('pdf_generator')
+            
+            # Los gráficos adelantados se usan tal cual; el agente dibuja solo los que faltan
+            prerendered = await charts_task if charts_task is not None else None
+            result = await pdf_agent.run(report_file, prerendered)
             
             if result:
-                print(f"PDF Generator Agent completado: {result}")
+                logger.info("PDF Generator Agent completado: %s", result)
                 return result
             else:
-                print("PDF Generator Agent fallo")
+                logger.warning("PDF Generator Agent fallo")
                 return None
                 
         except Exception as e:
-            print(f"Error en PDF Generator Agent: {e}")
+            logger.error("Error en PDF Generator Agent: %s", e)
             return None
     
-    def _log_step(self, step: str, status: str, details: str):
-        """Registra un paso en el log de ejecución"""
+    def _log_step(self, step: str, status: str, details: str, ts: Optional[str] = None):
+        """Registra un paso en el log de ejecución (ts: instante ya calculado para el paso)"""
         log_entry = {
             'step': step,
             'status': status,
             'details': details,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': ts or datetime.now().isoformat()
         }
         self.execution_log.append(log_entry)
     
     async def get_system_status(self) -> Dict:
         """Obtiene el estado actual del sistema"""
         return {
+            # Los agentes se crean al usarse: se informan los ya creados y los disponibles
             'agents_initialized': len(self.agents),
-            'available_agents': list(self.agents.keys()),
-            'last_execution_log': self.execution_log[-5:] if self.execution_log else [],
-            'system_ready': len(self.agents) == 3,
+            'available_agents': list(AGENT_NAMES),
+            'last_execution_log': list(self.execution_log),
+            'system_ready': bool(self.api_key),
             'mode': 'dolar_api'
         }
 
 
+def format_final_summary(results: Dict) -> str:
+    """Arma el resumen final de una ejecución (estado, pasos y errores) en un solo texto"""
+    parts = [
+        f"\n{SEPARATOR}",
+        "RESUMEN FINAL",
+        SEPARATOR,
+        f"Estado: {results['status']}",
+        f"Tiempo de ejecucion: {results.get('execution_time_seconds', 0):.2f} segundos"
+    ]
+    
+    if results['steps']:
+        parts.append("\nPasos completados:")
+        for step, data in results['steps'].items():
+            status_icon = "OK" if data['status'] == 'success' else "ERROR"
+            parts.append(f"  {status_icon} {step}: {data['status']}")
+            if data['status'] == 'success':
+                if step == 'dolar_collection':
+                    parts.append(f"     Datos: {data['output_data']} cotizaciones")
+                else:
+                    parts.append(f"     Archivo: {data['output_file']}")
+    
+    if results['errors']:
+        parts.append(f"\nErrores ({len(results['errors'])}):")
+        parts.extend(f"  - {error}" for error in results['errors'])
+    
+    return "\n".join(parts)
+
+
+async def preflight_check(api_key: str) -> List[str]:
+    """Verificaciones rápidas antes de crear el orquestador: formato de la API key y DolarAPI disponible"""
+    import httpx
+    
+    errors = []
+    if not API_KEY_PATTERN.fullmatch(api_key):
+        errors.append("GOOGLE_API_KEY no tiene el formato de una API key de Google")
+    
+    try:
+        async with httpx.AsyncClient(timeout=PREFLIGHT_TIMEOUT) as client:
+            response = await client.head(DOLARAPI_URL)
+        if response.status_code >= 500:
+            errors.append(f"DolarAPI no disponible (HTTP {response.status_code})")
+    except httpx.HTTPError as e:
+        errors.append(f"No se pudo conectar con DolarAPI: {e}")
+    
+    return errors
+
+
 async def main():
     """Función principal para ejecutar el sistema multiagente con DolarAPI"""
     print("Sistema Multiagente de Analisis Financiero Argentina (DolarAPI)")
@@ -306,6 +517,14 @@ async def main():
         print("Por favor, configura tu API key de Google en el archivo .env")
         return
     
+    # Cortar antes de inicializar nada si la key es inválida o DolarAPI no responde
+    preflight_errors = await preflight_check(api_key)
+    if preflight_errors:
+        print("Verificacion previa fallida:")
+        for error in preflight_errors:
+            print(f"   - {error}")
+        return
+    
     try:
         # Inicializar orquestador
         orchestrator = MultiAgentOrchestratorDolar(api_key)
@@ -319,35 +538,15 @@ async def main():
             return
         
         # Ejecutar análisis completo
-        results = await orchestrator.execute_full_analysis()
+        with log_to_stdout():
+            results = await orchestrator.execute_full_analysis()
         
         # Mostrar resultados finales
-        print("\n" + "="*60)
-        print("RESUMEN FINAL")
-        print("="*60)
-        print(f"Estado: {results['status']}")
-        print(f"Tiempo de ejecucion: {results.get('execution_time_seconds', 0):.2f} segundos")
-        
-        if results['steps']:
-            print("\nPasos completados:")
-            for step, data in results['steps'].items():
-                status_icon = "OK" if data['status'] == 'success' else "ERROR"
-                print(f"  {status_icon} {step}: {data['status']}")
-                if data['status'] == 'success':
-                    if step == 'dolar_collection':
-                        print(f"     Datos: {data['output_data']} cotizaciones")
-                    else:
-                        print(f"     Archivo: {data['output_file']}")
-        
-        if results['errors']:
-            print(f"\nErrores ({len(results['errors'])}):")
-            for error in results['errors']:
-                print(f"  - {error}")
+        print(format_final_summary(results))
         
         # Guardar log de ejecución
-        log_file = f"execution_log_dolar_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        with open(log_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        log_file = f"execution_log_dolar_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        await asyncio.to_thread(_write_json_sync, log_file, results)
         
         print(f"\nLog de ejecucion guardado en: {log_file}")
         
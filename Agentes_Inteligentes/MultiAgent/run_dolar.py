@@ -9,11 +9,16 @@ import sys
 import os
 from datetime import datetime
 
-# Agregar el directorio actual al path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Agregar el directorio actual al path (al ejecutar el script ya es sys.path[0])
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
 
 from config import Config
-from orchestrator_dolar import MultiAgentOrchestratorDolar
+from orchestrator_dolar import MultiAgentOrchestratorDolar, format_final_summary, log_to_stdout
+
+# Extensiones de los archivos que se listan al terminar el análisis
+REPORT_SUFFIXES = ('.json', '.html')
 
 
 def print_banner():
@@ -35,9 +40,12 @@ async def run_complete_analysis():
     
     try:
         orchestrator = MultiAgentOrchestratorDolar(Config.GOOGLE_API_KEY)
-        results = await orchestrator.execute_full_analysis()
         
-        if results['status'] == 'completed':
+        # El progreso del orquestador se muestra mientras corre; el resumen se imprime después
+        with log_to_stdout():
+            results = await orchestrator.execute_full_analysis()
+        
+        if results['status'] in ('completed', 'completed_cached'):
             print("\nAnalisis completado exitosamente!")
             print("Archivos generados:")
             for step, data in results['steps'].items():
@@ -82,27 +90,7 @@ async def main():
     results = await run_complete_analysis()
     
     if results:
-        print("\n" + "=" * 60)
-        print("RESUMEN FINAL")
-        print("=" * 60)
-        print(f"Estado: {results['status']}")
-        print(f"Tiempo de ejecucion: {results.get('execution_time_seconds', 0):.2f} segundos")
-        
-        if results['steps']:
-            print("\nPasos completados:")
-            for step, data in results['steps'].items():
-                status_icon = "OK" if data['status'] == 'success' else "ERROR"
-                print(f"  {status_icon} {step}: {data['status']}")
-                if data['status'] == 'success':
-                    if step == 'dolar_collection':
-                        print(f"     Datos: {data['output_data']} cotizaciones")
-                    else:
-                        print(f"     Archivo: {data['output_file']}")
-        
-        if results['errors']:
-            print(f"\nErrores ({len(results['errors'])}):")
-            for error in results['errors']:
-                print(f"  - {error}")
+        print(format_final_summary(results))
         
         # Mostrar archivos generados
         print("\n" + "=" * 60)
@@ -113,21 +101,21 @@ async def main():
         directories = ['data', 'reports', 'presentations']
         for directory in directories:
             if os.path.exists(directory):
-                files = [f for f in os.listdir(directory) if f.endswith(('.json', '.html'))]
+                with os.scandir(directory) as entries:
+                    files = [e for e in entries if e.name.endswith(REPORT_SUFFIXES)]
                 if files:
                     print(f"\n{directory.upper()}:")
-                    for file in sorted(files)[-3:]:  # Mostrar los últimos 3 archivos
-                        filepath = os.path.join(directory, file)
-                        size = os.path.getsize(filepath)
-                        print(f"  - {file} ({size} bytes)")
+                    # Mostrar los últimos 3 archivos; el tamaño sale de la entrada del directorio
+                    for entry in sorted(files, key=lambda e: e.name)[-3:]:
+                        print(f"  - {entry.name} ({entry.stat().st_size} bytes)")
         
         # Verificar archivos CSV
-        csv_files = [f for f in os.listdir('.') if f.endswith('.csv')]
+        with os.scandir('.') as entries:
+            csv_files = [e for e in entries if e.name.endswith('.csv')]
         if csv_files:
             print(f"\nCSV FILES:")
-            for file in csv_files:
-                size = os.path.getsize(file)
-                print(f"  - {file} ({size} bytes)")
+            for entry in csv_files:
+                print(f"  - {entry.name} ({entry.stat().st_size} bytes)")
     
     print("\nProceso completado.")
 
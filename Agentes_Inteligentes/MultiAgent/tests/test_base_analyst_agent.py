@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la base de los agentes analistas
+"""
+
+import asyncio
+import collections
+import os
+import sys
+import time
+
+# Los agentes se importan como módulos sueltos, igual que desde el orquestador
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'agents'))
+
+import base_analyst_agent
+from base_analyst_agent import (
+    BaseAnalystAgent,
+    _disk_cache_get,
+    _disk_cache_path,
+    _disk_cache_set,
+    _model_clients,
+    close_model_clients,
+    get_model_client
+)
+
+
+def test_cache_en_disco_borra_la_entrada_vencida_al_leerla(tmp_path, monkeypatch):
+    """Una entrada vencida no se devuelve y su archivo se elimina"""
+    monkeypatch.setattr(base_analyst_agent, 'LLM_DISK_CACHE_DIR', str(tmp_path))
+    _disk_cache_set('clave', 'respuesta')
+    assert _disk_cache_get('clave') == 'respuesta'
+    
+    monkeypatch.setattr(base_analyst_agent, 'LLM_DISK_CACHE_TTL', -1)
+    _disk_cache_set('clave', 'respuesta')
+    
+    assert _disk_cache_get('clave') is None
+    assert not os.path.exists(_disk_cache_path('clave'))
+
+
+def test_cache_en_disco_descarta_vencidas_y_mas_viejas_al_guardar(tmp_path, monkeypatch):
+    """Al guardar se borran los archivos vencidos y los que exceden el límite de entradas"""
+    monkeypatch.setattr(base_analyst_agent, 'LLM_DISK_CACHE_DIR', str(tmp_path))
+    now = time.time()
+    for key in ('vencida', 'vieja', 'reciente'):
+        _disk_cache_set(key, key)
+    monkeypatch.setattr(base_analyst_agent, 'LLM_DISK_CACHE_MAX_ENTRIES', 2)
+    os.utime(_disk_cache_path('vencida'), (now - 2 * 86400, now - 2 * 86400))
+    os.utime(_disk_cache_path('vieja'), (now - 60, now - 60))
+    os.utime(_disk_cache_path('reciente'), (now - 30, now - 30))
+    
+    _disk_cache_set('nueva', 'nueva')
+    
+    assert sorted(os.listdir(tmp_path)) == ['nueva.json', 'reciente.json']
+
+
+def test_close_model_clients_cierra_el_cliente_del_loop():
+    """Al cerrar los clientes del loop se cierra su pool HTTP y el loop deja de estar registrado"""
+    async def client_and_loop():
+        client = get_model_client('test-key')
+        assert get_model_client('test-key') is client
+        await close_model_clients()
+        return client, asyncio.get_running_loop()
+    
+    client, loop = asyncio.run(client_and_loop())
+    
+    assert client._client.is_closed()
+    assert loop not in _model_clients
+
+
+def _agent_con_respuestas(monkeypatch, system_prompt, prompts):
+    """Agente cuyo _run_prompt anota cada prompt enviado y responde con el mensaje de sistema"""
+    agent = BaseAnalystAgent('test-key', 'test_agent', system_prompt)
+    
+    async def fake_run_prompt(prompt):
+        prompts.append(prompt)
+        return f"{system_prompt}: {prompt}"
+    
+    monkeypatch.setattr(agent, '_run_prompt', fake_run_prompt)
+    return agent
+
+
+def test_cache_en_memoria_separa_mensajes_de_sistema_y_descarta_vencidas(tmp_path, monkeypatch):
+    """Otro mensaje de sistema no comparte respuesta; las entradas vencidas o de más se descartan"""
+    monkeypatch.setattr(base_analyst_agent, '_llm_cache', collections.OrderedDict())
+    monkeypatch.setattr(base_analyst_agent, 'LLM_DISK_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(base_analyst_agent, 'LLM_CACHE_MAX_ENTRIES', 2)
+    prompts = []
+    first = _agent_con_respuestas(monkeypatch, 'sistema A', prompts)
+    second = _agent_con_respuestas(monkeypatch, 'sistema B', prompts)
+    
+    async def run():
+        assert await first._cached_run('p1') == 'sistema A: p1'
+        assert await first._cached_run('p1') == 'sistema A: p1'
+        assert await second._cached_run('p1') == 'sistema B: p1'
+        await first._cached_run('p2')
+    
+    asyncio.run(run())
+    
+    cache = base_analyst_agent._llm_cache
+    assert prompts == ['p1', 'p1', 'p2']
+    assert len(cache) == 2
+    
+    # Una entrada vencida no se devuelve: se descarta y se vuelve a consultar
+    key = next(iter(cache))
+    cache[key] = (0.0, 'vencida')
+    for name in os.listdir(tmp_path):
+        os.remove(tmp_path / name)
+    
+    assert asyncio.run(second._cached_run('p1')) == 'sistema B: p1'
+    assert prompts == ['p1', 'p1', 'p2', 'p1']
+    assert cache[key][0] > time.monotonic()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del Data Analyst Agent
+"""
+
+import asyncio
+import collections
+import os
+import sys
+
+# Los agentes se importan como módulos sueltos, igual que desde el orquestador
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'agents'))
+
+import base_analyst_agent
+from data_analyst_agent import DataAnalystAgent
+
+
+def test_tendencias_salen_de_cache_entre_ejecuciones(tmp_path, monkeypatch):
+    """El timestamp de la ejecución no forma parte del prompt de tendencias"""
+    monkeypatch.setattr(base_analyst_agent, '_llm_cache', collections.OrderedDict())
+    monkeypatch.setattr(base_analyst_agent, 'LLM_DISK_CACHE_DIR', str(tmp_path))
+    analyst = DataAnalystAgent("test-key")
+    prompts = []
+    
+    async def fake_run_prompt(prompt):
+        prompts.append(prompt)
+        return "análisis"
+    
+    monkeypatch.setattr(analyst, '_run_prompt', fake_run_prompt)
+    data = {'merval': {'change': '+1.25%'}, 'stocks': [], 'currency': {'price': 1450.0}}
+    
+    first = asyncio.run(analyst._analyze_market_trends(data, '2026-01-01T10:00:00'))
+    second = asyncio.run(analyst._analyze_market_trends(data, '2026-01-01T11:00:00'))
+    
+    assert len(prompts) == 1
+    assert first['trend_data']['timestamp'] == '2026-01-01T10:00:00'
+    assert second['trend_data']['timestamp'] == '2026-01-01T11:00:00'
+    assert second['analysis'] == "análisis"
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del Dolar Analyst Agent
+"""
+
+import asyncio
+import os
+import sys
+
+import numpy as np
+import orjson
+
+# Los agentes se importan como módulos sueltos, igual que desde el orquestador
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'agents'))
+
+from dolar_analyst_agent import DolarAnalystAgent, _compute_gaps, _compute_spreads
+
+
+def test_run_from_dict_sin_cotizaciones_guarda_reporte_de_error(tmp_path, monkeypatch):
+    """Sin cotizaciones se guarda el reporte de error (sin timestamp) en lugar de fallar"""
+    monkeypatch.chdir(tmp_path)
+    analyst = DolarAnalystAgent("test-key")
+    
+    filepath = asyncio.run(analyst.run_from_dict({'dolar_data': []}))
+    
+    assert filepath
+    with open(filepath, 'rb') as f:
+        assert orjson.loads(f.read()) == {'error': 'No se encontraron datos de DolarAPI'}
+
+
+def test_brechas_sin_precio_oficial_valido_no_se_calculan():
+    """Con el oficial en cero las brechas porcentuales quedan en NaN, sin dividir por cero"""
+    ventas = np.array([0.0, 1500.0])
+    
+    with np.errstate(all='raise'):
+        gap_amount, gap_pct = _compute_gaps(ventas, 0.0)
+    
+    assert gap_amount.tolist() == [0.0, 1500.0]
+    assert np.isnan(gap_pct).all()
+
+
+def test_spreads_con_precios_faltantes():
+    """Sin precio de compra el spread porcentual es 0; con un precio faltante el spread es NaN"""
+    ventas = np.array([1450.0, 1500.0, np.nan])
+    compras = np.array([1400.0, 0.0, 1400.0])
+    
+    spread, spread_pct = _compute_spreads(ventas, compras)
+    
+    assert spread[:2].tolist() == [50.0, 1500.0]
+    assert np.isnan(spread[2])
+    assert spread_pct[1] == 0.0
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas del orquestador con DolarAPI
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orchestrator_dolar import _shared_agent, close_model_clients
+
+
+def test_agente_compartido_usa_un_cliente_por_event_loop():
+    """Un agente compartido no reutiliza el cliente de Gemini de un event loop ya cerrado"""
+    analyst = _shared_agent('dolar_analyst', 'test-key')
+    
+    async def client_and_loop():
+        client = analyst.model_client
+        await close_model_clients()
+        return client, asyncio.get_running_loop()
+    
+    first_client, first_loop = asyncio.run(client_and_loop())
+    second_client, _ = asyncio.run(client_and_loop())
+    
+    assert first_loop.is_closed()
+    assert second_client is not first_client
+    assert _shared_agent('dolar_analyst', 'test-key') is analyst
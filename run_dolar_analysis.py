@@ -12,10 +12,14 @@ from datetime import datetime
 
 # Agregar el directorio MultiAgent al path
 multiagent_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Agentes_Inteligentes', 'MultiAgent')
-sys.path.append(multiagent_path)
+if multiagent_path not in sys.path:
+    sys.path.append(multiagent_path)
 
 from config import Config
-from orchestrator_dolar import MultiAgentOrchestratorDolar
+from orchestrator_dolar import MultiAgentOrchestratorDolar, format_final_summary, log_to_stdout
+
+# Extensiones de los archivos que se listan al terminar el análisis
+REPORT_SUFFIXES = ('.json', '.pdf', '.csv')
 
 
 def print_banner():
@@ -37,9 +41,12 @@ async def run_complete_analysis():
     
     try:
         orchestrator = MultiAgentOrchestratorDolar(Config.GOOGLE_API_KEY)
-        results = await orchestrator.execute_full_analysis()
         
-        if results['status'] == 'completed':
+        # El progreso del orquestador se muestra mientras corre; el resumen se imprime después
+        with log_to_stdout():
+            results = await orchestrator.execute_full_analysis()
+        
+        if results['status'] in ('completed', 'completed_cached'):
             print("\nAnalisis completado exitosamente!")
             print("Archivos generados:")
             for step, data in results['steps'].items():
@@ -84,27 +91,7 @@ async def main():
     results = await run_complete_analysis()
     
     if results:
-        print("\n" + "=" * 60)
-        print("RESUMEN FINAL")
-        print("=" * 60)
-        print(f"Estado: {results['status']}")
-        print(f"Tiempo de ejecucion: {results.get('execution_time_seconds', 0):.2f} segundos")
-        
-        if results['steps']:
-            print("\nPasos completados:")
-            for step, data in results['steps'].items():
-                status_icon = "OK" if data['status'] == 'success' else "ERROR"
-                print(f"  {status_icon} {step}: {data['status']}")
-                if data['status'] == 'success':
-                    if step == 'dolar_collection':
-                        print(f"     Datos: {data['output_data']} cotizaciones")
-                    else:
-                        print(f"     Archivo: {data['output_file']}")
-        
-        if results['errors']:
-            print(f"\nErrores ({len(results['errors'])}):")
-            for error in results['errors']:
-                print(f"  - {error}")
+        print(format_final_summary(results))
         
         # Mostrar archivos generados
         print("\n" + "=" * 60)
@@ -116,18 +103,21 @@ async def main():
         for directory in multiagent_dirs:
             dir_path = os.path.join(multiagent_path, directory)
             if os.path.exists(dir_path):
-                files = [f for f in os.listdir(dir_path) if f.endswith(('.json', '.pdf', '.csv'))]
+                with os.scandir(dir_path) as entries:
+                    files = [e for e in entries if e.name.endswith(REPORT_SUFFIXES)]
                 if files:
                     print(f"\n{directory.upper()}:")
-                    for file in sorted(files)[-3:]:  # Mostrar los últimos 3 archivos
-                        filepath = os.path.join(dir_path, file)
-                        size = os.path.getsize(filepath)
-                        print(f"  - {file} ({size} bytes)")
+                    # Mostrar los últimos 3 archivos; el tamaño sale de la entrada del directorio
+                    for entry in sorted(files, key=lambda e: e.name)[-3:]:
+                        print(f"  - {entry.name} ({entry.stat().st_size} bytes)")
         
         # Verificar archivos CSV en MultiAgent
         csv_path = os.path.join(multiagent_path, 'dolar_historico.csv')
-        if os.path.exists(csv_path):
+        try:
             size = os.path.getsize(csv_path)
+        except OSError:
+            size = None
+        if size is not None:
             print(f"\nCSV FILES:")
             print(f"  - dolar_historico.csv ({size} bytes)")
     